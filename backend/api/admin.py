@@ -1,21 +1,148 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
 from django.contrib.auth.admin import UserAdmin
-from django.db.models import Count
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils import timezone
+from django.utils.html import format_html
+from recipes import pantry, shopping_list
 from recipes.models import (
     Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag)
 
-from .models import Subscription, User
+from . import jobs
+from .constants import ADMIN_ESTIMATED_COUNT_THRESHOLD, CLEANUP_CHUNK_SIZE
+from .models import Job, RequestProfile, Subscription, User
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц.
+    Для списка без фильтров берёт оценку числа строк из статистики
+    PostgreSQL (pg_class.reltuples) вместо полного COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self._estimate(queryset)
+            if estimate is not None and (
+                estimate >= ADMIN_ESTIMATED_COUNT_THRESHOLD
+            ):
+                return estimate
+        return super().count
+
+    @staticmethod
+    def _estimate(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
+class ScalableAdminMixin:
+    """Общие настройки changelist для таблиц, которые растут без границ."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        extra = '' if settings.DEBUG else '.min'
+        return super().media + forms.Media(
+            js=(
+                f'admin/js/vendor/jquery/jquery{extra}.js',
+                f'admin/js/vendor/select2/select2.full{extra}.js',
+                'admin/js/jquery.init.js',
+                'admin/js/autocomplete.js',
+                'api/js/autocomplete_filter.js',
+            ),
+            css={
+                'screen': (
+                    f'admin/css/vendor/select2/select2{extra}.css',
+                    'admin/css/autocomplete.css',
+                ),
+            },
+        )
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Фильтр по внешнему ключу с поиском через autocomplete.
+    В отличие от обычного list_filter не выводит все объекты
+    связанной модели, а подгружает их по мере ввода.
+    """
+
+    template = 'admin/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f'{self.field_name}__id__exact'
+        self.field = model._meta.get_field(self.field_name)
+        self.title = self.field.verbose_name
+        self.app_label = model._meta.app_label
+        self.model_name = model._meta.model_name
+        super().__init__(request, params, model, model_admin)
+
+    @property
+    def autocomplete_url(self):
+        return reverse('admin:autocomplete')
+
+    @cached_property
+    def selected(self):
+        if not self.value():
+            return None
+        remote_model = self.field.remote_field.model
+        return remote_model._default_manager.filter(pk=self.value()).first()
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            return queryset.filter(**{self.parameter_name: int(self.value())})
+        except ValueError as error:
+            raise IncorrectLookupParameters(error)
+
+
+class AuthorFilter(AutocompleteFilter):
+    field_name = 'author'
+
+
+class UserFilter(AutocompleteFilter):
+    field_name = 'user'
 
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ScalableAdminMixin, UserAdmin):
     """Кастомный админ для модели User."""
 
     list_display = (
         'id', 'username', 'email', 'last_name', 'first_name', 'role'
     )
     list_filter = ('role',)
-    search_fields = ('email', 'username')
+    search_fields = ('^email', '^username')
     ordering = ('id',)
 
     fieldsets = (
@@ -41,6 +168,27 @@ class CustomUserAdmin(UserAdmin):
         ),
     )
 
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, User.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        """
+        Пользователей с большим числом рецептов отключает и отдаёт
+        воркеру: он удаляет их каскад пакетами (задача users.delete).
+        """
+        large = list(
+            queryset.annotate(recipes_count=Count('recipes'))
+            .filter(recipes_count__gt=CLEANUP_CHUNK_SIZE)
+            .values_list('pk', flat=True)
+        )
+        if large:
+            User.objects.filter(pk__in=large).update(is_active=False)
+            for user_id in large:
+                jobs.enqueue(
+                    'users.delete', user_id, key=f'delete-user:{user_id}'
+                )
+        super().delete_queryset(request, queryset.exclude(pk__in=large))
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -56,7 +204,7 @@ class IngredientAdmin(admin.ModelAdmin):
     """Админка для модели Ingredient."""
 
     list_display = ('id', 'name', 'measurement_unit')
-    search_fields = ('name',)
+    search_fields = ('^name',)
 
 
 class RecipeIngredientInline(admin.TabularInline):
@@ -68,7 +216,7 @@ class RecipeIngredientInline(admin.TabularInline):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Админка для модели Recipe."""
 
     inlines = (RecipeIngredientInline,)
@@ -82,13 +230,37 @@ class RecipeAdmin(admin.ModelAdmin):
         'pub_date',
         'favorites_count',
     )
-    search_fields = ('name', 'author__username')
-    list_filter = ('author', 'tags')
+    search_fields = ('^name', '^author__username')
+    list_filter = (AuthorFilter, 'tags')
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
     ordering = ('-pub_date',)
 
     def get_queryset(self, request):
+        # Подзапрос считается только для строк текущей страницы,
+        # а не агрегирует всю таблицу избранного.
+        favorites_count = (
+            Favorite.objects
+            .filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
         queryset = super().get_queryset(request)
-        return queryset.annotate(_favorites_count=Count('favorited_by'))
+        return queryset.annotate(
+            _favorites_count=Coalesce(Subquery(favorites_count), 0)
+        )
+
+    def save_related(self, request, form, formsets, change):
+        recipe_id = form.instance.pk
+        old_keys = pantry.recipe_keys(recipe_id) if change else set()
+        super().save_related(request, form, formsets, change)
+        pantry.update_recipe(recipe_id, old_keys)
+        shopping_list.recipes_changed([recipe_id])
+        jobs.enqueue(
+            'recipes.index_similar', recipe_id, key=f'similar:{recipe_id}'
+        )
 
     def favorites_count(self, obj):
         """Количество добавлений в избранное."""
@@ -99,32 +271,139 @@ class RecipeAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Админка для модели Favorite."""
 
     list_display = ('id', 'user', 'recipe')
-    search_fields = ('user__username', 'recipe__name')
+    search_fields = ('^user__username', '^recipe__name')
+    list_select_related = ('user', 'recipe')
+    list_filter = (UserFilter,)
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Админка для модели ShoppingCart."""
 
     list_display = ('id', 'user', 'recipe')
-    search_fields = ('user__username', 'recipe__name')
+    search_fields = ('^user__username', '^recipe__name')
+    list_select_related = ('user', 'recipe')
+    list_filter = (UserFilter,)
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Админка для модели Subscription ."""
 
     list_display = ('id', 'user', 'author')
-    search_fields = ('user__username', 'author__username')
+    search_fields = ('^user__username', '^author__username')
+    list_select_related = ('user', 'author')
+    list_filter = (UserFilter,)
+    autocomplete_fields = ('user', 'author')
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
-    """Recipe Ingraadient."""
+class RecipeIngredientAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    """Админка для модели RecipeIngredient."""
 
     list_display = ('id', 'recipe', 'ingredient', 'amount')
-    search_fields = ('recipe__name', 'ingredient__name')
+    search_fields = ('^recipe__name', '^ingredient__name')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        shopping_list.recipes_changed(
+            [obj.recipe_id, form.initial.get('recipe', obj.recipe_id)]
+        )
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        shopping_list.recipes_changed([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        shopping_list.recipes_changed(recipe_ids)
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    """Профили запросов; файл скачивается только через админку."""
+
+    list_display = (
+        'id', 'created_at', 'method', 'path', 'status_code',
+        'duration_ms', 'mode', 'user', 'download',
+    )
+    list_filter = ('mode', 'method')
+    search_fields = ('^path',)
+    list_select_related = ('user',)
+    readonly_fields = (
+        'created_at', 'user', 'method', 'path', 'status_code',
+        'duration_ms', 'mode', 'download', 'allocations',
+    )
+    exclude = ('profile',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='api_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        extension = profile.profile.name.split('.', 1)[-1]
+        return FileResponse(
+            profile.profile.open('rb'),
+            as_attachment=True,
+            filename=f'request-{profile.pk}.{extension}',
+        )
+
+    def download(self, obj):
+        """Ссылка на файл pstats или speedscope JSON."""
+
+        url = reverse('admin:api_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">Скачать</a>', url)
+
+    download.short_description = 'Профиль'
+
+
+@admin.register(Job)
+class JobAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    """Отложенные задачи; упавшие можно перезапустить."""
+
+    list_display = (
+        'id', 'name', 'status', 'priority', 'attempts', 'max_attempts',
+        'run_at', 'worker',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    readonly_fields = (
+        'name', 'args', 'key', 'priority', 'status', 'attempts',
+        'max_attempts', 'run_at', 'locked_until', 'worker', 'last_error',
+        'created_at',
+    )
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Перезапустить')
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            worker='', locked_until=None, key=None,
+        )
+        self.message_user(request, f'Перезапущено задач: {updated}')
@@ -5,3 +5,13 @@ class ApiConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from foodgram_backend import cleanup, fuzzy_search
+        from foodgram_backend.db import slow_queries  # noqa: F401
+
+        from . import tasks  # noqa: F401
+        from .models import User
+
+        fuzzy_search.register(User, 'username')
+        cleanup.register(User, 'avatar')
@@ -0,0 +1,274 @@
+"""
+Асинхронные версии read-эндпоинтов для запуска под ASGI.
+
+GET-запросы к спискам и карточкам обслуживаются нативными async-view
+на асинхронном ORM, независимые запросы (count и страница, пакеты
+prefetch) выполняются параллельно. Остальные методы, а также
+browsable API (text/html, ?format=) и JSON с отступами передаются
+штатным DRF-view, поэтому поведение записи не меняется. Ответы повторяют формат
+соответствующих DRF-сериализаторов.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.urls import re_path
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+
+from foodgram_backend import fuzzy_search
+from foodgram_backend.server_timing import measure
+
+from .fast_serializers import (USER_FIELDS, subscribed_ids,
+                               user_representation)
+from .models import User
+from .throttling import get_store, throttle_wait
+
+
+class ReadRequest:
+    """
+    Обёртка над HttpRequest с интерфейсом DRF Request,
+    достаточным для фильтров, пагинаторов и построения ссылок.
+    """
+
+    def __init__(self, request, user):
+        self._request = request
+        self.user = user
+        self.query_params = request.GET
+
+    def __getattr__(self, attr):
+        return getattr(self._request, attr)
+
+
+def _run_isolated(func):
+    # Каждый поток пула держит своё соединение с БД.
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def gather(*funcs):
+    """
+    Выполняет синхронные ORM-вызовы параллельно, каждый в своём потоке
+    и на своём соединении. Асинхронные методы ORM Django 4.2
+    сериализуются в одном потоке, поэтому здесь thread_sensitive=False.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_run_isolated, thread_sensitive=False)(func)
+        for func in funcs
+    ))
+
+
+def render(data, status=200):
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    response = HttpResponse(
+        renderer.render(data),
+        status=status,
+        content_type=renderer.media_type,
+    )
+    response['Vary'] = 'Accept'
+    return response
+
+
+def not_found(model):
+    """Та же ошибка, что у get_object_or_404 в DRF-view."""
+    return exceptions.NotFound(
+        f'No {model._meta.object_name} matches the given query.'
+    )
+
+
+def _error_response(exc):
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = render(data, status=exc.status_code)
+    if isinstance(
+        exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+    ):
+        response['WWW-Authenticate'] = 'Token'
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+async def authenticate(request):
+    """Асинхронный аналог TokenAuthentication."""
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return AnonymousUser()
+    if len(auth) == 1:
+        raise exceptions.AuthenticationFailed(
+            _('Invalid token header. No credentials provided.'))
+    if len(auth) > 2:
+        raise exceptions.AuthenticationFailed(
+            _('Invalid token header. '
+              'Token string should not contain spaces.'))
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed(
+            _('Invalid token header. '
+              'Token string should not contain invalid characters.'))
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    return token.user
+
+
+async def paginate(request, pagination_class, queryset, fetch_page):
+    """
+    Страница в формате PageNumberPagination: COUNT и выборка страницы
+    выполняются одновременно. fetch_page(queryset) -> list строк.
+    """
+    pagination = pagination_class()
+    page_size = pagination.get_page_size(request)
+    page_number = request.query_params.get(pagination.page_query_param) or 1
+    paginator = Paginator((), page_size)
+    try:
+        number = int(page_number)
+    except ValueError:
+        number = None
+    if number is None or number < 1:
+        if page_number not in pagination.last_page_strings:
+            raise exceptions.NotFound(_('Invalid page.'))
+        paginator.count = await queryset.acount()
+        number = paginator.num_pages
+    offset = (number - 1) * page_size
+    count, rows = await gather(
+        queryset.count,
+        lambda: fetch_page(queryset[offset:offset + page_size]),
+    )
+    paginator.count = count
+    try:
+        paginator.validate_number(number)
+    except InvalidPage:
+        raise exceptions.NotFound(_('Invalid page.'))
+    pagination.page = Page(rows, number, paginator)
+    pagination.request = request
+    return pagination
+
+
+async def users_list(request):
+    from .views import UsersPagination
+
+    queryset = await sync_to_async(fuzzy_search.search)(
+        User.objects.order_by('id'), 'username',
+        request.query_params.get(api_settings.SEARCH_PARAM, ''),
+    )
+    pagination = await paginate(
+        request, UsersPagination, queryset,
+        lambda page: list(page.values(*USER_FIELDS)),
+    )
+    rows = pagination.page.object_list
+    subscribed = await sync_to_async(subscribed_ids)(
+        request.user, [row['id'] for row in rows]
+    )
+    return pagination.get_paginated_response(
+        [user_representation(request, row, subscribed) for row in rows]
+    ).data
+
+
+async def user_detail(request, id):
+    try:
+        row = await User.objects.values(*USER_FIELDS).aget(id=id)
+    except User.DoesNotExist:
+        raise not_found(User)
+    subscribed = await sync_to_async(subscribed_ids)(
+        request.user, [row['id']]
+    )
+    return user_representation(request, row, subscribed)
+
+
+async def user_me(request):
+    if not request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    row = await User.objects.values(*USER_FIELDS).aget(id=request.user.id)
+    return user_representation(request, row, set())
+
+
+def _needs_drf_rendering(request):
+    """Browsable API и отступы в JSON рендерит штатный DRF-view."""
+    accept = request.headers.get('Accept', '')
+    return (
+        'format' in request.GET or 'text/html' in accept or 'indent' in accept
+    )
+
+
+def async_read_view(handler, fallback):
+    """
+    Async-view: GET/HEAD обслуживает handler, остальные методы
+    и browsable API — штатный DRF-view fallback.
+    """
+    sync_fallback = sync_to_async(fallback)
+    # Экземпляр DRF-view нужен только для его throttle-классов и scope.
+    drf_view = fallback.cls(**fallback.initkwargs)
+
+    async def check_throttles(request):
+        if get_store().local:
+            wait = throttle_wait(request, drf_view)
+        else:
+            wait = await sync_to_async(
+                throttle_wait, thread_sensitive=False
+            )(request, drf_view)
+        if wait is not None:
+            raise exceptions.Throttled(wait or None)
+
+    async def view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or (
+            _needs_drf_rendering(request)
+        ):
+            return await sync_fallback(request, *args, **kwargs)
+        try:
+            with measure('auth'):
+                request.user = await authenticate(request)
+            request = ReadRequest(request, request.user)
+            with measure('throttle'):
+                await check_throttles(request)
+            data = await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return _error_response(exc)
+        if isinstance(data, HttpResponse):
+            return data
+        return render(data)
+
+    view.csrf_exempt = True
+    view.cls = fallback.cls
+    view.initkwargs = fallback.initkwargs
+    return view
+
+
+def async_urlpatterns(router):
+    """Маршруты async-view; подключаются перед маршрутами router."""
+    from recipes import async_views as recipes_views
+
+    drf_views = {url.name: url.callback for url in reversed(router.urls)}
+    routes = (
+        (r'^users/$', users_list, 'users-list'),
+        (r'^users/me/$', user_me, 'users-me'),
+        (r'^users/(?P<id>\d+)/$', user_detail, 'users-detail'),
+        (r'^recipes/$', recipes_views.recipes_list, 'recipes-list'),
+        (r'^recipes/(?P<pk>\d+)/$', recipes_views.recipe_detail,
+         'recipes-detail'),
+        (r'^tags/$', recipes_views.tags_list, 'tags-list'),
+        (r'^tags/(?P<id>\d+)/$', recipes_views.tag_detail, 'tags-detail'),
+        (r'^ingredients/$', recipes_views.ingredients_list,
+         'ingredients-list'),
+        (r'^ingredients/(?P<pk>\d+)/$', recipes_views.ingredient_detail,
+         'ingredients-detail'),
+    )
+    return [
+        re_path(regex, async_read_view(handler, drf_views[name]), name=name)
+        for regex, handler, name in routes
+    ]
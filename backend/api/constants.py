@@ -9,3 +9,56 @@ MIN_INGREDIENT_AMOUNT = 1
 MAX_INGREDIENT_AMOUNT = 32_000
 MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 32_000
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10_000
+FEED_PAGE_SIZE = 6
+FEED_MAX_PAGE_SIZE = 100
+FEED_TIMELINE_LENGTH = 500
+FEED_FANOUT_MAX_FOLLOWERS = 1_000
+FEED_FANOUT_BATCH_SIZE = 1_000
+FEED_TRIM_EVERY = 50
+REFERENCE_VERSION_CHECK_INTERVAL = 1
+SHORT_LINK_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+SHORT_LINK_MODULUS = 62 ** 6
+SHORT_LINK_MULTIPLIER = 1_580_030_173
+SHORT_LINK_CACHE_SIZE = 10_000
+SHORT_LINK_FLUSH_CLICKS = 100
+SHORT_LINK_FLUSH_INTERVAL = 10
+PROFILE_MAX_PATH_LENGTH = 2000
+PROFILE_SAMPLE_INTERVAL = 0.001
+PROFILE_TRACEMALLOC_FRAMES = 10
+PROFILE_TOP_ALLOCATIONS = 30
+SIMILAR_NUM_HASHES = 64
+SIMILAR_BAND_ROWS = 4
+SIMILAR_HASH_SEED = 20_260_419
+SIMILAR_MAX_CANDIDATES = 500
+SIMILAR_PAGE_SIZE = 6
+SIMILAR_MAX_PAGE_SIZE = 30
+PANTRY_MAX_INGREDIENTS = 50
+PANTRY_MAX_MISSING = 5
+PANTRY_DEFAULT_MISSING = 2
+RANK_TRENDING_HALF_LIFE = 2 * 24 * 3600
+RANK_POPULAR_HALF_LIFE = 90 * 24 * 3600
+RANK_FAVORITE_WEIGHT = 1.0
+RANK_SHOPPING_CART_WEIGHT = 0.5
+RANK_MIN_SCORE = 0.05
+FUZZY_SEARCH_THRESHOLD = 0.3
+FUZZY_SEARCH_MIN_LENGTH = 3
+INGREDIENT_SEARCH_LIMIT = 50
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_BATCH_SIZE = 200
+IMPORT_MAX_ERRORS = 1000
+IMPORT_MAX_IMAGE_SIZE = 10 * 1024 * 1024
+JOB_NAME_MAX_LENGTH = 200
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BASE_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 3600
+JOBS_LOCK_TIMEOUT = 600
+JOBS_LOCK_RENEW_INTERVAL = 60
+JOBS_POLL_INTERVAL = 1
+JOBS_FAILED_RETENTION = 7 * 24 * 3600
+SHOPPING_LIST_CACHE_TIMEOUT = 24 * 3600
+CLEANUP_CHUNK_SIZE = 500
+MEDIA_SWEEP_BATCH_SIZE = 1000
+MEDIA_SWEEP_GRACE = 3600
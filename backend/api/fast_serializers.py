@@ -0,0 +1,76 @@
+"""
+Быстрые read-представления пользователей.
+
+Собирают те же словари, что UserReadSerializer, напрямую из строк
+``.values()``, без полей DRF на каждой записи. Используются в
+горячих списках; запись и валидация остаются за DRF-сериализаторами.
+"""
+import re
+from functools import partial
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+
+from .models import Subscription
+
+USER_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'avatar'
+)
+# Имена, которые filepath_to_uri возвращает без изменений.
+URI_SAFE_NAME = re.compile(r'[\w./-]+', re.ASCII).fullmatch
+
+
+def file_url(request, name):
+    """Аналог ImageField.to_representation для значения из .values()."""
+    if not name:
+        return None
+    return request.build_absolute_uri(default_storage.url(name))
+
+
+def file_url_builder(request):
+    """
+    file_url для многих файлов одного запроса: абсолютный префикс
+    MEDIA_URL вычисляется один раз. Имена с './', '../' и ':' (их
+    по-своему разбирает urljoin) и другие хранилища идут через file_url.
+    """
+    if not isinstance(default_storage, FileSystemStorage):
+        return partial(file_url, request)
+    prefix = []
+
+    def build(name):
+        if not name:
+            return None
+        if './' in name or ':' in name:
+            return file_url(request, name)
+        if not prefix:
+            prefix.append(
+                request.build_absolute_uri(default_storage.base_url)
+            )
+        if URI_SAFE_NAME(name):
+            return prefix[0] + name.lstrip('/')
+        return prefix[0] + filepath_to_uri(name).lstrip('/')
+
+    return build
+
+
+def user_representation(request, row, subscribed_ids):
+    """Словарь в формате UserReadSerializer."""
+    return {
+        'id': row['id'],
+        'email': row['email'],
+        'username': row['username'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'is_subscribed': row['id'] in subscribed_ids,
+        'avatar': file_url(request, row['avatar']),
+    }
+
+
+def subscribed_ids(user, author_ids):
+    if not user.is_authenticated or not author_ids:
+        return set()
+    return set(
+        Subscription.objects
+        .filter(user=user, author_id__in=author_ids)
+        .values_list('author_id', flat=True)
+    )
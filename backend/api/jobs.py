@@ -0,0 +1,271 @@
+"""
+Очередь отложенных задач в базе (модель Job) без внешнего брокера.
+
+Задача — функция, зарегистрированная декоратором task(); enqueue()
+кладёт в таблицу её имя и аргументы (JSON) в текущей транзакции,
+так что задача видна воркеру только вместе с данными, ради которых
+поставлена. Воркер (manage.py run_jobs) забирает задачи по
+приоритету и времени запуска и выполняет их в пуле потоков. Упавшая
+задача повторяется с экспоненциальной задержкой до max_attempts раз,
+потом остаётся в таблице со статусом failed и текстом ошибки. Живой
+воркер продлевает блокировку своих задач каждые
+JOBS_LOCK_RENEW_INTERVAL секунд; задача воркера, пропавшего дольше
+JOBS_LOCK_TIMEOUT, возвращается в очередь, а результат прежнего
+выполнения (удаление или повтор) её новую выдачу уже не трогает.
+Задачи с key не дублируются, пока одна из них ждёт в очереди;
+периодические (every=) воркер ставит сам и после выполнения
+откладывает на every секунд. JOBS_EAGER=True выполняет задачи сразу
+после фиксации транзакции, без воркера (разработка).
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, IntegrityError, connections,
+                       transaction)
+from django.utils import timezone
+
+from .constants import (JOBS_FAILED_RETENTION, JOBS_LOCK_RENEW_INTERVAL,
+                        JOBS_LOCK_TIMEOUT, JOBS_MAX_ATTEMPTS,
+                        JOBS_POLL_INTERVAL, JOBS_RETRY_BASE_DELAY,
+                        JOBS_RETRY_MAX_DELAY)
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+Task = namedtuple('Task', 'func priority max_attempts every')
+
+TASKS = {}
+
+
+def task(name, priority=0, max_attempts=JOBS_MAX_ATTEMPTS, every=None):
+    """Регистрирует функцию как задачу name."""
+    def decorator(func):
+        TASKS[name] = Task(func, priority, max_attempts, every)
+        return func
+    return decorator
+
+
+def enqueue(name, *args, delay=0, key=None, priority=None):
+    """
+    Ставит задачу name(*args) в очередь. Возвращает Job или None,
+    если задача с тем же key уже ждёт.
+    """
+    registered = TASKS[name]
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: registered.func(*args))
+        return None
+    job = Job(
+        name=name,
+        args=list(args),
+        key=key,
+        priority=registered.priority if priority is None else priority,
+        max_attempts=registered.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return None
+    return job
+
+
+def retry_delay(attempts):
+    """Задержка перед попыткой attempts + 1: 2^n с джиттером."""
+    delay = min(
+        JOBS_RETRY_BASE_DELAY * 2 ** (attempts - 1), JOBS_RETRY_MAX_DELAY
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def _fail(job, error):
+    attempts = job.attempts + 1
+    if attempts >= job.max_attempts:
+        updates = {'status': Job.FAILED}
+    else:
+        updates = {
+            'status': Job.QUEUED,
+            'run_at': timezone.now() + timedelta(
+                seconds=retry_delay(attempts)
+            ),
+        }
+    claimed = Job.objects.filter(pk=job.pk, worker=job.worker)
+    try:
+        with transaction.atomic():
+            updated = claimed.update(
+                attempts=attempts, last_error=error, worker='',
+                locked_until=None, **updates,
+            )
+    except IntegrityError:
+        # С тем же key уже ждёт задача: повтор выполнит она.
+        claimed.delete()
+        return
+    registered = TASKS.get(job.name)
+    if updated and updates['status'] == Job.FAILED and (
+        registered and registered.every
+    ):
+        # Периодическая задача не должна остановиться до перезапуска
+        # воркера: следующий запуск — по обычному расписанию.
+        enqueue(
+            job.name, delay=registered.every, key=f'periodic:{job.name}'
+        )
+
+
+def execute(job):
+    """Выполняет взятую воркером задачу и записывает результат."""
+    try:
+        registered = TASKS.get(job.name)
+        if registered is None:
+            job.attempts = job.max_attempts
+            _fail(job, f'Неизвестная задача {job.name}')
+            return
+        try:
+            registered.func(*job.args)
+        except Exception:
+            logger.exception('Задача %s упала', job)
+            _fail(job, traceback.format_exc())
+            return
+        deleted, _ = Job.objects.filter(pk=job.pk, worker=job.worker).delete()
+        if deleted and registered.every:
+            enqueue(
+                job.name, delay=registered.every,
+                key=f'periodic:{job.name}',
+            )
+    finally:
+        connections.close_all()
+
+
+def claim(limit, worker):
+    """Забирает до limit готовых задач для воркера worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('-priority', 'run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        # Условие по статусу защищает от двойной выдачи там, где нет
+        # SKIP LOCKED (SQLite).
+        Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker,
+            locked_until=now + timedelta(seconds=JOBS_LOCK_TIMEOUT),
+        )
+    return list(
+        Job.objects
+        .filter(id__in=ids, status=Job.RUNNING, worker=worker)
+        .order_by('-priority', 'run_at', 'id')
+    )
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, не отчитавшихся вовремя."""
+    for job in Job.objects.filter(
+        status=Job.RUNNING, locked_until__lt=timezone.now()
+    ):
+        try:
+            _fail(job, f'Воркер {job.worker} не завершил задачу вовремя.')
+        except DatabaseError:
+            logger.exception('Не удалось вернуть в очередь %s', job)
+
+
+def schedule_periodic():
+    for name, registered in TASKS.items():
+        if registered.every:
+            enqueue(name, key=f'periodic:{name}')
+
+
+@task('jobs.cleanup', every=24 * 3600)
+def cleanup():
+    """Удаляет давно упавшие задачи."""
+    Job.objects.filter(
+        status=Job.FAILED,
+        run_at__lt=timezone.now() - timedelta(seconds=JOBS_FAILED_RETENTION),
+    ).delete()
+
+
+class Worker:
+    """Цикл воркера: забирает задачи и выполняет их в пуле потоков."""
+
+    def __init__(self, threads=1, burst=False):
+        self.threads = threads
+        self.burst = burst
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.checked_at = None
+        self.renewed_at = time.monotonic()
+
+    def stop(self):
+        self.stopping.set()
+
+    def renew_locks(self):
+        """Продлевает блокировку задач, которые выполняет этот воркер."""
+        Job.objects.filter(
+            status=Job.RUNNING, worker__startswith=f'{self.name}:'
+        ).update(
+            locked_until=timezone.now() + timedelta(seconds=JOBS_LOCK_TIMEOUT)
+        )
+
+    def _poll(self, free, running):
+        """
+        Продлевает блокировки, возвращает зависшие задачи в очередь и
+        забирает до free новых.
+        """
+        now = time.monotonic()
+        if running and now - self.renewed_at > JOBS_LOCK_RENEW_INTERVAL:
+            self.renew_locks()
+            self.renewed_at = now
+        if self.checked_at is None or (
+            now - self.checked_at > JOBS_POLL_INTERVAL
+        ):
+            requeue_stale()
+            self.checked_at = now
+        if not free:
+            return []
+        return claim(free, f'{self.name}:{uuid.uuid4().hex}')
+
+    def run(self):
+        schedule_periodic()
+        running = set()
+        with ThreadPoolExecutor(
+            self.threads, thread_name_prefix='job'
+        ) as executor:
+            while not self.stopping.is_set():
+                running = {future for future in running if not future.done()}
+                free = self.threads - len(running)
+                try:
+                    jobs = self._poll(free, running)
+                except DatabaseError:
+                    # Ошибка базы не должна останавливать воркер:
+                    # следующий опрос повторит попытку.
+                    logger.exception('Опрос очереди не удался')
+                    connections.close_all()
+                    jobs = []
+                running.update(executor.submit(execute, job) for job in jobs)
+                if not jobs and not running and self.burst:
+                    break
+                if running and (not free or not jobs):
+                    wait(
+                        running, timeout=JOBS_POLL_INTERVAL,
+                        return_when=FIRST_COMPLETED,
+                    )
+                elif not jobs:
+                    self.stopping.wait(JOBS_POLL_INTERVAL)
+            wait(running)
+        connections.close_all()
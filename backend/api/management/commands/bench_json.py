@@ -0,0 +1,75 @@
+import io
+import timeit
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+from recipes.models import Recipe
+from recipes.serializers import RecipeReadSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость JSONRenderer/JSONParser и orjson-версий '
+        'на странице рецептов и проверяет совпадение вывода.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, items, repeat, **options):
+        recipes = list(
+            Recipe.objects
+            .select_related('author')
+            .prefetch_related('tags', 'recipe_ingredients__ingredient')
+            [:items]
+        )
+        if not recipes:
+            raise CommandError('В базе нет рецептов.')
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        results = RecipeReadSerializer(
+            list(islice(cycle(recipes), items)),
+            many=True,
+            context={'request': request},
+        ).data
+        data = {'count': items, 'next': None, 'previous': None,
+                'results': results}
+
+        json_renderer, orjson_renderer = JSONRenderer(), ORJSONRenderer()
+        body = json_renderer.render(data)
+        if orjson_renderer.render(data) != body:
+            raise CommandError('Вывод рендереров различается.')
+        self.stdout.write(f'Страница: {items} рецептов, {len(body)} байт.')
+        self.report('render', repeat, [
+            ('JSONRenderer', lambda: json_renderer.render(data)),
+            ('ORJSONRenderer', lambda: orjson_renderer.render(data)),
+        ])
+
+        json_parser, orjson_parser = JSONParser(), ORJSONParser()
+        if orjson_parser.parse(io.BytesIO(body)) != json_parser.parse(
+            io.BytesIO(body)
+        ):
+            raise CommandError('Результат парсеров различается.')
+        self.report('parse', repeat, [
+            ('JSONParser', lambda: json_parser.parse(io.BytesIO(body))),
+            ('ORJSONParser', lambda: orjson_parser.parse(io.BytesIO(body))),
+        ])
+
+    def report(self, title, repeat, cases):
+        timings = []
+        for name, func in cases:
+            seconds = min(timeit.repeat(func, number=repeat, repeat=3))
+            timings.append(seconds)
+            self.stdout.write(
+                f'{title:<7}{name:<16}{seconds / repeat * 1e6:10.1f} мкс'
+            )
+        self.stdout.write(
+            f'{title:<7}ускорение x{timings[0] / timings[1]:.1f}'
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from recipes import pantry
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает инвертированный индекс ингредиентов '
+        'для поиска по имеющимся продуктам.'
+    )
+
+    def handle(self, *args, **options):
+        last_id = Recipe.objects.aggregate(last_id=Max('id'))['last_id']
+        chunks = 0 if last_id is None else last_id // pantry.CHUNK_SIZE + 1
+        for chunk in range(chunks):
+            pantry.rebuild_chunk(chunk)
+        self.stdout.write(f'Пересобрано блоков: {chunks}')
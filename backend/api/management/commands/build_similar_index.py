@@ -0,0 +1,37 @@
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.management.base import BaseCommand
+
+from recipes import similar
+from recipes.models import RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает MinHash-сигнатуры и корзины LSH '
+        'для похожих рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        rows = (
+            RecipeIngredient.objects
+            .order_by('recipe_id')
+            .values_list('recipe_id', 'ingredient_id')
+            .iterator(chunk_size=batch_size * 10)
+        )
+        indexed = 0
+        batch = {}
+        for recipe_id, group in groupby(rows, key=itemgetter(0)):
+            batch[recipe_id] = [ingredient_id for _, ingredient_id in group]
+            if len(batch) >= batch_size:
+                similar.index_recipes(batch)
+                indexed += len(batch)
+                batch = {}
+        if batch:
+            similar.index_recipes(batch)
+            indexed += len(batch)
+        self.stdout.write(f'Проиндексировано рецептов: {indexed}')
@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.constants import EXPORT_CHUNK_SIZE
+from recipes import export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты с тегами, ингредиентами и авторами в NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки (по умолчанию stdout).',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжать выгрузку gzip.'
+        )
+        parser.add_argument(
+            '--since',
+            help='Только рецепты, изменённые после этого момента (ISO 8601).',
+        )
+        parser.add_argument(
+            '--base-url', default='',
+            help='Префикс ссылок на изображения, например https://foodgram.ru',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+            help='Рецептов на пакет связанных данных.',
+        )
+
+    def handle(
+        self, *args, output, gzip, since, base_url, chunk_size, **options
+    ):
+        if since:
+            try:
+                since = export.parse_since(since)
+            except ValueError as error:
+                raise CommandError(str(error))
+        chunks = export.export_lines(
+            export.BaseUrl(base_url), since or None, chunk_size
+        )
+        if gzip:
+            chunks = export.gzip_chunks(chunks)
+        if output == '-':
+            self._write(sys.stdout.buffer, chunks)
+        else:
+            with open(output, 'wb') as file:
+                self._write(file, chunks)
+
+    def _write(self, file, chunks):
+        for chunk in chunks:
+            file.write(chunk)
+        file.flush()
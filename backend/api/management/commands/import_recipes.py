@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from api.models import User
+from recipes import bulk_import
+
+
+class Command(BaseCommand):
+    help = 'Импортирует рецепты из NDJSON или CSV пакетами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON или CSV.')
+        parser.add_argument(
+            '--author', required=True,
+            help='Автор рецептов: id, username или email.',
+        )
+        parser.add_argument(
+            '--images', help='Каталог или ZIP-архив с изображениями.'
+        )
+        parser.add_argument(
+            '--format', choices=bulk_import.FORMATS,
+            help='Формат файла (по умолчанию по расширению).',
+        )
+
+    def handle(self, *args, path, author, images, format, **options):
+        condition = Q(username=author) | Q(email=author)
+        if author.isdigit():
+            condition |= Q(pk=int(author))
+        author = User.objects.filter(condition).first()
+        if author is None:
+            raise CommandError('Автор не найден.')
+        if images:
+            try:
+                images = (
+                    bulk_import.ImageArchive(images)
+                    if images.lower().endswith('.zip')
+                    else bulk_import.ImageDirectory(images)
+                )
+            except OSError as error:
+                raise CommandError(str(error))
+        with open(path, 'rb') as file:
+            report = bulk_import.Importer(author, images).run(
+                bulk_import.read_rows(
+                    file, bulk_import.detect_format(path, format)
+                )
+            )
+        for error in report['errors']:
+            self.stderr.write(f'Строка {error["row"]}: {error["errors"]}')
+        self.stdout.write(
+            f'Создано рецептов: {report["created"]}, '
+            f'строк с ошибками: {report["failed"]}'
+        )
@@ -0,0 +1,221 @@
+import re
+from collections import namedtuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, Sum
+
+from api.models import Subscription, User
+from recipes.filters import with_tags
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+
+QueryPath = namedtuple('QueryPath', 'name build allowed index')
+
+SEQ_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! USING)'),
+}
+SORT = {
+    'postgresql': re.compile(r'(?:^|->\s*)(?:Incremental )?Sort\b', re.M),
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (?:ORDER|GROUP) BY'),
+}
+
+
+def _sample():
+    """
+    Id и slug реальных строк для параметров запросов; для пустой базы —
+    заглушки: с пустым списком ORM не строит запрос вовсе.
+    """
+    def first(queryset, field):
+        return queryset.values_list(field, flat=True).first() or 1
+
+    return {
+        'author': first(
+            Recipe.objects.values('author_id')
+            .annotate(count=Count('id')).order_by('-count'),
+            'author_id',
+        ),
+        'favorites_user': first(Favorite.objects.order_by(), 'user_id'),
+        'cart_user': first(ShoppingCart.objects.order_by(), 'user_id'),
+        'subscriber': first(Subscription.objects.order_by(), 'user_id'),
+        'feed_user': first(FeedEntry.objects.order_by(), 'user_id'),
+        'tags': list(Tag.objects.values_list('slug', flat=True)[:2]) or ['a'],
+        'recipes': (
+            list(Recipe.objects.values_list('id', flat=True)[:6]) or [1]
+        ),
+        'prefix': (
+            Ingredient.objects.values_list('name', flat=True).first() or 'а'
+        )[:2],
+    }
+
+
+# Горячие запросы API: как их строят view; allowed — допустимые
+# находки (сортировка ограниченного числа строк одного пользователя),
+# index — индекс, который закрывает путь, если план его не использует.
+PATHS = [
+    QueryPath(
+        'recipes-by-author',
+        lambda s: Recipe.objects.filter(author_id=s['author'])
+        .order_by('-pub_date', '-id')[:6],
+        (),
+        ('recipes_recipe', 'author_id, pub_date DESC, id DESC'),
+    ),
+    QueryPath(
+        'recipes-by-tags',
+        lambda s: with_tags(Recipe.objects.all(), s['tags'])[:6],
+        ('sort',),
+        ('recipes_recipe_tags', 'tag_id'),
+    ),
+    QueryPath(
+        'recipes-trending',
+        lambda s: Recipe.objects.order_by('-trending_score', '-pub_date')[:6],
+        (),
+        ('recipes_recipe', 'trending_score DESC, pub_date DESC'),
+    ),
+    QueryPath(
+        'recipes-favorited',
+        lambda s: Recipe.objects.filter(
+            favorited_by__user_id=s['favorites_user']
+        )[:6],
+        ('sort',),
+        ('recipes_favorite', 'user_id, recipe_id'),
+    ),
+    QueryPath(
+        'recipes-in-cart',
+        lambda s: Recipe.objects.filter(
+            in_shopping_carts__user_id=s['cart_user']
+        )[:6],
+        ('sort',),
+        ('recipes_shoppingcart', 'user_id, recipe_id'),
+    ),
+    QueryPath(
+        'favorites-by-user',
+        lambda s: Favorite.objects.filter(user_id=s['favorites_user'])
+        .order_by('recipe_id').values_list('recipe_id', flat=True),
+        (),
+        ('recipes_favorite', 'user_id, recipe_id'),
+    ),
+    QueryPath(
+        'cart-by-user',
+        lambda s: ShoppingCart.objects.filter(user_id=s['cart_user'])
+        .order_by('recipe_id').values_list('recipe_id', flat=True),
+        (),
+        ('recipes_shoppingcart', 'user_id, recipe_id'),
+    ),
+    QueryPath(
+        'shopping-list',
+        lambda s: RecipeIngredient.objects
+        .filter(recipe__in_shopping_carts__user_id=s['cart_user'])
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(amount=Sum('amount'))
+        .order_by('ingredient__name'),
+        ('sort',),
+        ('recipes_recipeingredient', 'recipe_id, ingredient_id'),
+    ),
+    QueryPath(
+        'subscriptions-by-user',
+        lambda s: Subscription.objects.filter(user_id=s['subscriber'])
+        .order_by('author_id').values_list('author_id', flat=True),
+        (),
+        ('api_subscription', 'user_id, author_id'),
+    ),
+    QueryPath(
+        'subscription-authors',
+        lambda s: User.objects.filter(
+            id__in=Subscription.objects.filter(user_id=s['subscriber'])
+            .values('author_id')
+        ).order_by('username')[:6],
+        ('sort',),
+        ('api_subscription', 'user_id, author_id'),
+    ),
+    QueryPath(
+        'feed-timeline',
+        lambda s: FeedEntry.objects.filter(user_id=s['feed_user'])
+        .order_by('-pub_date', '-recipe_id')[:6],
+        (),
+        ('recipes_feedentry', 'user_id, pub_date DESC, recipe_id DESC'),
+    ),
+    QueryPath(
+        'recipe-ingredients-batch',
+        lambda s: RecipeIngredient.objects.filter(recipe_id__in=s['recipes'])
+        .order_by('id'),
+        ('sort',),
+        ('recipes_recipeingredient', 'recipe_id, ingredient_id'),
+    ),
+    QueryPath(
+        'ingredient-prefix-search',
+        lambda s: Ingredient.objects.filter(name__istartswith=s['prefix']),
+        ('sort',),
+        ('recipes_ingredient', '(UPPER(name::text)) text_pattern_ops'),
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает планы горячих запросов API, отмечает последовательные '
+        'сканирования и сортировки и предлагает индексы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База для EXPLAIN (по умолчанию основная, не реплика).',
+        )
+        parser.add_argument(
+            '--plans', action='store_true', help='Показать планы целиком.'
+        )
+        parser.add_argument(
+            '--real-costs', action='store_true',
+            help=(
+                'Не запрещать планировщику Seq Scan. По умолчанию он '
+                'запрещён, чтобы на маленькой базе было видно, может ли '
+                'запрос вообще обойтись индексом.'
+            ),
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Завершиться с ошибкой, если план хоть одного пути '
+                 'отличается от ожидаемого (для CI).',
+        )
+
+    def handle(self, *args, database, plans, real_costs, check, **options):
+        connection = connections[database]
+        vendor = connection.vendor
+        if vendor not in SEQ_SCAN:
+            raise CommandError(f'EXPLAIN для {vendor} не поддерживается.')
+        sample = _sample()
+        regressions = []
+        for path in PATHS:
+            with transaction.atomic(using=database):
+                if vendor == 'postgresql' and not real_costs:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = path.build(sample).using(database).explain()
+            findings = [
+                f'seq scan {table}'
+                for table in SEQ_SCAN[vendor].findall(plan)
+            ]
+            if SORT[vendor].search(plan) and 'sort' not in path.allowed:
+                findings.append('sort')
+            if not findings:
+                self.stdout.write(self.style.SUCCESS(f'OK    {path.name}'))
+            else:
+                regressions.append(path.name)
+                self.stdout.write(self.style.WARNING(
+                    f'FLAG  {path.name}: {", ".join(findings)}'
+                ))
+                if path.index:
+                    table, columns = path.index
+                    self.stdout.write(
+                        f'      CREATE INDEX CONCURRENTLY ON {table} '
+                        f'({columns});'
+                    )
+            if plans or findings:
+                for line in plan.splitlines():
+                    self.stdout.write(f'      {line}')
+        if check and regressions:
+            raise CommandError(
+                f'Планы изменились: {", ".join(regressions)}'
+            )
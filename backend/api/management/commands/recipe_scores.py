@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes import ranking
+
+
+class Command(BaseCommand):
+    help = (
+        'Сжатие рейтингов «в тренде» и «популярное»: обнуляет затухшие. '
+        'Запускать периодически, например раз в час.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересчитать все рейтинги по избранному и спискам покупок.',
+        )
+
+    def handle(self, *args, rebuild, **options):
+        if rebuild:
+            count = ranking.rebuild()
+            self.stdout.write(f'Пересчитано рецептов: {count}')
+            return
+        count = ranking.compact()
+        self.stdout.write(f'Обнулено рейтингов: {count}')
@@ -0,0 +1,50 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import jobs
+
+# Кеши, которые видят все процессы и контейнеры: задачи меняют версии
+# корзин и справочников, и backend должен увидеть новые.
+SHARED_CACHES = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди отложенных задач (модель Job).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Число потоков, выполняющих задачи.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить готовые задачи и завершиться.',
+        )
+        parser.add_argument(
+            '--local-cache', action='store_true',
+            help=(
+                'Запустить с файловым кешем: только если его каталог '
+                '(CACHE_DIR) общий с backend, например на одном хосте.'
+            ),
+        )
+
+    def handle(self, *args, threads, burst, local_cache, **options):
+        backend = settings.CACHES['default']['BACKEND']
+        if backend not in SHARED_CACHES and not local_cache:
+            raise CommandError(
+                f'Кеш {backend} не общий с backend: сбросы версий из задач '
+                'останутся в кеше воркера. Задайте REDIS_URL или '
+                'запустите с --local-cache при общем CACHE_DIR.'
+            )
+        worker = jobs.Worker(max(threads, 1), burst)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+        self.stdout.write(f'Воркер {worker.name}: потоков {worker.threads}')
+        worker.run()
@@ -0,0 +1,75 @@
+from collections import Counter, defaultdict
+
+import orjson
+from django.core.management.base import BaseCommand
+
+from foodgram_backend.db.slow_queries import log_files
+
+SORT_KEYS = {
+    'total': lambda stats: stats['total_ms'],
+    'count': lambda stats: stats['count'],
+    'max': lambda stats: stats['max_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Самые тяжёлые отпечатки запросов из журнала медленных запросов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Показать последний снятый план для каждого отпечатка.',
+        )
+
+    def handle(self, *args, top, sort, plans, **options):
+        groups = defaultdict(lambda: {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'durations': [],
+            'origins': Counter(), 'sql': '', 'plan': None,
+        })
+        for path in log_files():
+            with open(path, 'rb') as log:
+                for line in log:
+                    try:
+                        record = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        continue
+                    stats = groups[record['fingerprint']]
+                    duration = record['duration_ms']
+                    stats['count'] += 1
+                    stats['total_ms'] += duration
+                    stats['max_ms'] = max(stats['max_ms'], duration)
+                    stats['durations'].append(duration)
+                    stats['sql'] = record['sql']
+                    stats['origins'][' / '.join(filter(None, (
+                        record['view'], record['serializer'],
+                        record['location'],
+                    ))) or '-'] += 1
+                    if record['plan']:
+                        stats['plan'] = record['plan']
+        if not groups:
+            self.stdout.write('Журнал медленных запросов пуст.')
+            return
+        ranked = sorted(
+            groups.items(), key=lambda item: SORT_KEYS[sort](item[1]),
+            reverse=True,
+        )
+        for digest, stats in ranked[:top]:
+            durations = sorted(stats['durations'])
+            p95 = durations[int(0.95 * (len(durations) - 1))]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{digest}  count={stats["count"]}  '
+                f'total={stats["total_ms"]:.1f}ms  '
+                f'p95={p95:.1f}ms  max={stats["max_ms"]:.1f}ms'
+            ))
+            self.stdout.write(f'  {stats["sql"]}')
+            for origin, count in stats['origins'].most_common(3):
+                self.stdout.write(f'  {count:>6}  {origin}')
+            if plans and stats['plan']:
+                for line in stats['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.constants import MEDIA_SWEEP_GRACE
+from foodgram_backend import cleanup
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT изображения рецептов и аватары, на которые '
+        'не ссылается ни одна строка. Воркер делает это раз в сутки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать потерянные файлы.',
+        )
+        parser.add_argument(
+            '--grace', type=int, default=MEDIA_SWEEP_GRACE,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+
+    def handle(self, *args, dry_run, grace, **options):
+        count = 0
+        for name in cleanup.sweep(grace, dry_run):
+            count += 1
+            if dry_run or options['verbosity'] > 1:
+                self.stdout.write(name)
+        verb = 'Найдено' if dry_run else 'Удалено'
+        self.stdout.write(f'{verb} потерянных файлов: {count}')
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:10
+
+from django.db import migrations
+
+SEARCH_INDEXES = (
+    ('api_user_username_upper_like', 'api_user', 'username'),
+    ('api_user_email_upper_like', 'api_user', 'email'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    """Индексы под istartswith: UPPER(column::text) LIKE UPPER('...%')."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} '
+            f'ON {table} (UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, _, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_user_avatar_subscription'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.23 on 2026-10-19 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_pull',
+            field=models.BooleanField(
+                default=False,
+                help_text='Рецепты автора не рассылаются в ленты подписчиков, а подмешиваются при чтении ленты.',
+                verbose_name='Лента собирается при чтении',
+            ),
+        ),
+    ]
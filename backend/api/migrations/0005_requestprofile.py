@@ -0,0 +1,81 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:28
+
+import api.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_user_feed_pull'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(auto_now_add=True, verbose_name='Дата'),
+                ),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=2000, verbose_name='Адрес')),
+                (
+                    'status_code',
+                    models.PositiveSmallIntegerField(verbose_name='Статус'),
+                ),
+                ('duration_ms', models.FloatField(verbose_name='Длительность, мс')),
+                (
+                    'mode',
+                    models.CharField(
+                        choices=[
+                            ('cprofile', 'cProfile (pstats)'),
+                            ('sample', 'Сэмплирование (speedscope)'),
+                        ],
+                        max_length=8,
+                        verbose_name='Профилировщик',
+                    ),
+                ),
+                (
+                    'profile',
+                    models.FileField(
+                        storage=api.models.profile_storage,
+                        upload_to='%Y/%m/',
+                        verbose_name='Профиль',
+                    ),
+                ),
+                (
+                    'allocations',
+                    models.TextField(
+                        blank=True, verbose_name='Выделения памяти (tracemalloc)'
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='request_profiles',
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='Пользователь',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-19 12:40
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('api_user_username_trgm', 'api_user', 'username'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """GIN-индексы pg_trgm под %, similarity() и ILIKE '%...%'."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for index_name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} '
+            f'ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_requestprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
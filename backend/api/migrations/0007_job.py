@@ -0,0 +1,106 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_user_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('name', models.CharField(max_length=200, verbose_name='Задача')),
+                ('args', models.JSONField(default=list, verbose_name='Аргументы')),
+                (
+                    'key',
+                    models.CharField(
+                        blank=True,
+                        help_text='Задача с тем же ключом ставится в очередь один раз.',
+                        max_length=200,
+                        null=True,
+                        verbose_name='Ключ',
+                    ),
+                ),
+                (
+                    'priority',
+                    models.SmallIntegerField(default=0, verbose_name='Приоритет'),
+                ),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('queued', 'В очереди'),
+                            ('running', 'Выполняется'),
+                            ('failed', 'Ошибка'),
+                        ],
+                        default='queued',
+                        max_length=7,
+                        verbose_name='Статус',
+                    ),
+                ),
+                (
+                    'attempts',
+                    models.PositiveSmallIntegerField(default=0, verbose_name='Попыток'),
+                ),
+                (
+                    'max_attempts',
+                    models.PositiveSmallIntegerField(verbose_name='Максимум попыток'),
+                ),
+                (
+                    'run_at',
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name='Запустить не раньше',
+                    ),
+                ),
+                (
+                    'locked_until',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='Занята до'
+                    ),
+                ),
+                (
+                    'worker',
+                    models.CharField(blank=True, max_length=200, verbose_name='Воркер'),
+                ),
+                ('last_error', models.TextField(blank=True, verbose_name='Ошибка')),
+                (
+                    'created_at',
+                    models.DateTimeField(auto_now_add=True, verbose_name='Создана'),
+                ),
+            ],
+            options={
+                'verbose_name': 'Задача',
+                'verbose_name_plural': 'Задачи',
+                'ordering': ['-priority', 'run_at', 'id'],
+                'indexes': [
+                    models.Index(
+                        fields=['status', '-priority', 'run_at', 'id'],
+                        name='job_queue_idx',
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('status', 'queued')),
+                fields=('key',),
+                name='job_queued_key_unique',
+            ),
+        ),
+    ]
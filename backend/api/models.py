@@ -1,8 +1,11 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.utils import timezone
 
-from .constants import EMAIL_MAX_LENGTH, USER_MAX_LENGTH
+from .constants import (EMAIL_MAX_LENGTH, JOB_NAME_MAX_LENGTH,
+                        PROFILE_MAX_PATH_LENGTH, USER_MAX_LENGTH)
 from .validators import validate_username
 
 
@@ -56,6 +59,15 @@ class User(AbstractUser):
         verbose_name='Роль',
     )
 
+    feed_pull = models.BooleanField(
+        default=False,
+        verbose_name='Лента собирается при чтении',
+        help_text=(
+            'Рецепты автора не рассылаются в ленты подписчиков, '
+            'а подмешиваются при чтении ленты.'
+        ),
+    )
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username',
                        'first_name', 'last_name']
@@ -86,3 +98,127 @@ class Subscription(models.Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         unique_together = ('user', 'author')
+
+
+def profile_storage():
+    """Профили хранятся вне MEDIA_ROOT: nginx не должен их раздавать."""
+    return FileSystemStorage(location=settings.PROFILE_DIR)
+
+
+class RequestProfile(models.Model):
+    """Профиль одного запроса, снятый по просьбе staff-пользователя."""
+
+    CPROFILE = 'cprofile'
+    SAMPLE = 'sample'
+
+    MODE_CHOICES = [
+        (CPROFILE, 'cProfile (pstats)'),
+        (SAMPLE, 'Сэмплирование (speedscope)'),
+    ]
+
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='request_profiles',
+        verbose_name='Пользователь',
+    )
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(
+        max_length=PROFILE_MAX_PATH_LENGTH, verbose_name='Адрес'
+    )
+    status_code = models.PositiveSmallIntegerField(verbose_name='Статус')
+    duration_ms = models.FloatField(verbose_name='Длительность, мс')
+    mode = models.CharField(
+        max_length=max(len(mode) for mode, _ in MODE_CHOICES),
+        choices=MODE_CHOICES,
+        verbose_name='Профилировщик',
+    )
+    profile = models.FileField(
+        upload_to='%Y/%m/', storage=profile_storage, verbose_name='Профиль'
+    )
+    allocations = models.TextField(
+        blank=True, verbose_name='Выделения памяти (tracemalloc)'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.method} {self.path}'
+
+
+class Job(models.Model):
+    """Отложенная задача для воркера manage.py run_jobs."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(
+        max_length=JOB_NAME_MAX_LENGTH, verbose_name='Задача'
+    )
+    args = models.JSONField(default=list, verbose_name='Аргументы')
+    key = models.CharField(
+        max_length=JOB_NAME_MAX_LENGTH, null=True, blank=True,
+        verbose_name='Ключ',
+        help_text='Задача с тем же ключом ставится в очередь один раз.',
+    )
+    priority = models.SmallIntegerField(default=0, verbose_name='Приоритет')
+    status = models.CharField(
+        max_length=max(len(status) for status, _ in STATUS_CHOICES),
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='Статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Запустить не раньше'
+    )
+    locked_until = models.DateTimeField(
+        null=True, blank=True, verbose_name='Занята до'
+    )
+    worker = models.CharField(
+        max_length=JOB_NAME_MAX_LENGTH, blank=True, verbose_name='Воркер'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Создана'
+    )
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ['-priority', 'run_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at', 'id'],
+                name='job_queue_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='queued'),
+                name='job_queued_key_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name}{tuple(self.args)}'
@@ -0,0 +1,34 @@
+"""JSON-парсер на orjson с откатом на штатный JSONParser."""
+import io
+
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+# orjson читает целые шире 64 бит как float, а json — как int. Такие
+# числа не короче 19 цифр; ищем их через translate: цифры -> '0',
+# остальное -> ' ', затем поиск подстроки. Обе операции — на C.
+DIGITS = bytes(
+    ord('0') if ord('0') <= byte <= ord('9') else ord(' ')
+    for byte in range(256)
+)
+LONG_NUMBER = b'0' * 19
+
+
+class ORJSONParser(JSONParser):
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        if (
+            encoding.lower().replace('-', '') == 'utf8'
+            and LONG_NUMBER not in body.translate(DIGITS)
+        ):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                # Одиночные суррогаты, ошибки синтаксиса и т. п.:
+                # результат и текст ошибки — как у JSONParser.
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
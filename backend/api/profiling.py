@@ -0,0 +1,285 @@
+"""
+Профилирование отдельного запроса по просьбе staff-пользователя.
+
+Заголовок X-Profile (или параметр ?_profile=) со значением cprofile
+запускает запрос под cProfile, sample — под сэмплирующим
+профилировщиком (стек раз в PROFILE_SAMPLE_INTERVAL секунд).
+X-Profile-Memory: 1 (?_profile_memory=1) дополнительно включает
+tracemalloc. Результат — файл pstats или speedscope JSON — сохраняется
+в RequestProfile и скачивается из админки; ответ получает заголовки
+X-Profile-Id и X-Profile-Url. Запросы остальных пользователей
+обслуживаются как обычно. Под ASGI cProfile видит только поток
+event loop, а сэмплирование — все потоки процесса, включая чужие
+запросы. В процессе одновременно снимается не больше одного профиля.
+"""
+import cProfile
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+import orjson
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from rest_framework import exceptions
+from rest_framework.authentication import (TokenAuthentication,
+                                           get_authorization_header)
+
+from .constants import (PROFILE_MAX_PATH_LENGTH, PROFILE_SAMPLE_INTERVAL,
+                        PROFILE_TOP_ALLOCATIONS, PROFILE_TRACEMALLOC_FRAMES)
+from .models import RequestProfile
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = '_profile'
+MEMORY_HEADER = 'X-Profile-Memory'
+MEMORY_PARAM = '_profile_memory'
+
+_busy = threading.Lock()
+
+
+class DeterministicProfiler:
+    """cProfile; результат — файл pstats."""
+
+    mode = RequestProfile.CPROFILE
+    extension = 'prof'
+
+    def __init__(self, thread_ids):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def dump(self, name):
+        return marshal.dumps(pstats.Stats(self._profile).stats)
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профилировщик на sys._current_frames.
+    thread_ids=None — все потоки процесса. Результат — speedscope JSON.
+    """
+
+    mode = RequestProfile.SAMPLE
+    extension = 'speedscope.json'
+
+    def __init__(self, thread_ids):
+        self.thread_ids = thread_ids
+        self._frames = {}
+        self._samples = []
+        self._weights = []
+        self._running = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._running.set()
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        self._thread.join()
+
+    def _frame_index(self, frame):
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _run(self):
+        own_id = threading.get_ident()
+        previous = time.perf_counter()
+        while self._running.is_set():
+            time.sleep(PROFILE_SAMPLE_INTERVAL)
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (
+                    self.thread_ids is not None
+                    and thread_id not in self.thread_ids
+                ):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_index(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self._samples.append(stack)
+                self._weights.append((now - previous) * 1000)
+            previous = now
+
+    def dump(self, name):
+        frames = [
+            {'name': func, 'file': file, 'line': line}
+            for func, file, line in self._frames
+        ]
+        return orjson.dumps({
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'foodgram',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': sum(self._weights),
+                'samples': self._samples,
+                'weights': self._weights,
+            }],
+        })
+
+
+PROFILERS = {
+    profiler.mode: profiler
+    for profiler in (DeterministicProfiler, SamplingProfiler)
+}
+
+
+def _requested(request, header, param):
+    return request.headers.get(header) or request.GET.get(param)
+
+
+def _staff_user(request):
+    """Staff-пользователь по токену или сессии, иначе None."""
+    auth = get_authorization_header(request).split()
+    if len(auth) == 2 and auth[0].lower() == b'token':
+        try:
+            user, _ = TokenAuthentication().authenticate_credentials(
+                auth[1].decode()
+            )
+        except (exceptions.AuthenticationFailed, UnicodeError):
+            return None
+    else:
+        user = getattr(request, 'user', None)
+    if user is None or not user.is_staff:
+        return None
+    return user
+
+
+def _allocations(snapshot, peak):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    lines = [f'Пик: {peak / 1024:.1f} KiB']
+    for stat in snapshot.statistics('traceback')[:PROFILE_TOP_ALLOCATIONS]:
+        lines.append(f'{stat.size / 1024:.1f} KiB в {stat.count} блоках')
+        lines.extend(
+            f'    {line}'
+            for line in stat.traceback.format(most_recent_first=True)
+        )
+    return '\n'.join(lines)
+
+
+class ProfileSession:
+    """Профилирование одного запроса."""
+
+    def __init__(self, request, user, mode, memory, thread_ids):
+        self.request = request
+        self.user = user
+        self.profiler = PROFILERS[mode](thread_ids)
+        self.memory = memory and not tracemalloc.is_tracing()
+
+    def start(self):
+        if self.memory:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        self.started = time.perf_counter()
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+        self.duration = (time.perf_counter() - self.started) * 1000
+        self.allocations = ''
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.allocations = _allocations(snapshot, peak)
+
+    def save(self, response):
+        request = self.request
+        name = f'{request.method} {request.get_full_path()}'
+        profile = RequestProfile(
+            user=self.user,
+            method=request.method,
+            path=request.get_full_path()[:PROFILE_MAX_PATH_LENGTH],
+            status_code=response.status_code,
+            duration_ms=round(self.duration, 3),
+            mode=self.profiler.mode,
+            allocations=self.allocations,
+        )
+        profile.profile.save(
+            f'profile.{self.profiler.extension}',
+            ContentFile(self.profiler.dump(name)),
+        )
+        response['X-Profile-Id'] = profile.pk
+        response['X-Profile-Url'] = request.build_absolute_uri(reverse(
+            'admin:api_requestprofile_change', args=[profile.pk]
+        ))
+        return response
+
+
+def _session(request, user, thread_ids):
+    mode = _requested(request, PROFILE_HEADER, PROFILE_PARAM)
+    if mode not in PROFILERS:
+        mode = RequestProfile.CPROFILE
+    memory = _requested(request, MEMORY_HEADER, MEMORY_PARAM) in (
+        '1', 'true'
+    )
+    return ProfileSession(request, user, mode, memory, thread_ids)
+
+
+class ProfilerMiddleware:
+    """Снимает профиль запроса, если его попросил staff-пользователь."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _requested(request, PROFILE_HEADER, PROFILE_PARAM):
+            return self.get_response(request)
+        user = _staff_user(request)
+        if user is None or not _busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            session = _session(request, user, {threading.get_ident()})
+            session.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                session.stop()
+            return session.save(response)
+        finally:
+            _busy.release()
+
+    async def __acall__(self, request):
+        if not _requested(request, PROFILE_HEADER, PROFILE_PARAM):
+            return await self.get_response(request)
+        user = await sync_to_async(_staff_user)(request)
+        if user is None or not _busy.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            session = _session(request, user, None)
+            session.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                session.stop()
+            return await sync_to_async(session.save)(response)
+        finally:
+            _busy.release()
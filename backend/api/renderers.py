@@ -0,0 +1,50 @@
+"""
+JSON-рендерер на orjson.
+
+Выдаёт те же байты, что штатный JSONRenderer при настройках DRF
+по умолчанию (UNICODE_JSON, COMPACT_JSON, STRICT_JSON): типы, которые
+orjson не сериализует сам, отдаются в default DRF-энкодера. Запросы
+с отступами (browsable API, ``indent`` в Accept) и всё, что orjson
+не умеет (целые больше 64 бит и т. п.), рендерятся штатным путём.
+Расхождения касаются только float: NaN и бесконечности orjson пишет
+как null вместо ошибки, а числа в экспоненциальной записи — без
+знака и ведущего нуля показателя (1e-7 и 1e20 вместо 1e-07 и
+1e+20). Значение при разборе то же; полей float в ответах API нет.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from foodgram_backend.server_timing import measure
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    @measure('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            self.encoder_class is not JSONEncoder
+            or not api_settings.UNICODE_JSON
+            or not api_settings.COMPACT_JSON
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=JSONEncoder().default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем U+2028/U+2029 для JSONP.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
@@ -2,6 +2,8 @@ from django.contrib.auth import authenticate, get_user_model
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from foodgram_backend.metrics import TimedRepresentationMixin
+
 from .models import Subscription
 
 User = get_user_model()
@@ -81,7 +83,9 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return True
 
 
-class SubscriptionDetailSerializer(serializers.ModelSerializer):
+class SubscriptionDetailSerializer(
+    TimedRepresentationMixin, serializers.ModelSerializer
+):
     """Сериализатор для списка моих подписок с рецептами."""
 
     email = serializers.EmailField(read_only=True)
@@ -115,7 +119,8 @@ class SubscriptionDetailSerializer(serializers.ModelSerializer):
         return author.followering.filter(user=user).exists()
 
     def get_recipes(self, author):
-        from recipes.serializers import RecipeMinifiedSerializer
+        from recipes.fast_serializers import (MINIFIED_FIELDS,
+                                              represent_minified)
 
         request = self.context['request']
         limit = request.query_params.get('recipes_limit')
@@ -126,8 +131,7 @@ class SubscriptionDetailSerializer(serializers.ModelSerializer):
             limit = None
         if limit:
             recipe = recipe[:limit]
-        return RecipeMinifiedSerializer(recipe,
-                                        many=True, context=self.context).data
+        return represent_minified(request, recipe.values(*MINIFIED_FIELDS))
 
 
 class EmailAuthTokenSerializer(serializers.Serializer):
@@ -0,0 +1,17 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Переход на changelist с выбранным значением autocomplete-фильтра.
+    $(document).on('change', 'select[data-autocomplete-filter]', function() {
+        const params = new URLSearchParams(window.location.search);
+        const name = this.dataset.autocompleteFilter;
+        params.delete('p');
+        if (this.value) {
+            params.set(name, this.value);
+        } else {
+            params.delete(name);
+        }
+        window.location.search = params.toString();
+    });
+}
@@ -0,0 +1,40 @@
+"""Отложенные задачи пользователей и файлов для очереди api.jobs."""
+import logging
+
+from django.db.models import Q
+
+from foodgram_backend import cleanup
+from recipes.models import FeedEntry, Favorite, Recipe, ShoppingCart
+
+from .jobs import task
+from .models import Subscription, User
+
+logger = logging.getLogger(__name__)
+
+
+@task('users.delete')
+def delete_user(user_id):
+    """
+    Удаление пользователя пакетами: сначала строки других
+    пользователей, ссылающиеся на его рецепты, затем рецепты, его
+    собственные строки и он сам.
+    """
+    for queryset in (
+        FeedEntry.objects.filter(recipe__author_id=user_id),
+        Favorite.objects.filter(recipe__author_id=user_id),
+        ShoppingCart.objects.filter(recipe__author_id=user_id),
+        Recipe.objects.filter(author_id=user_id),
+        FeedEntry.objects.filter(user_id=user_id),
+        Favorite.objects.filter(user_id=user_id),
+        ShoppingCart.objects.filter(user_id=user_id),
+        Subscription.objects.filter(Q(user_id=user_id) | Q(author_id=user_id)),
+    ):
+        cleanup.delete_in_chunks(queryset)
+    User.objects.filter(pk=user_id).delete()
+
+
+@task('media.sweep', every=24 * 3600)
+def sweep_media():
+    """Удаляет файлы, на которые не ссылается ни одна строка."""
+    orphans = sum(1 for _ in cleanup.sweep())
+    logger.info('Удалено потерянных файлов: %s', orphans)
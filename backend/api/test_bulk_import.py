@@ -0,0 +1,145 @@
+"""Пакетный импорт recipes.bulk_import."""
+import base64
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+import orjson
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes import bulk_import
+from recipes.models import Ingredient, Recipe, Tag
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImporterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user(
+            email='cook@example.com', username='cook', password='x',
+            first_name='C', last_name='K',
+        )
+        cls.tag = Tag.objects.create(name='Ужин', slug='dinner')
+        cls.salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def row(self, name, **fields):
+        return {
+            'name': name, 'text': 'текст', 'cooking_time': 10,
+            'tags': ['dinner'],
+            'ingredients': [{'name': 'соль', 'amount': 5}],
+            'image': 'data:image/png;base64,'
+                     + base64.b64encode(png()).decode(),
+            **fields,
+        }
+
+    def run_ndjson(self, lines, images=None):
+        content = b'\n'.join(
+            line if isinstance(line, bytes) else orjson.dumps(line)
+            for line in lines
+        )
+        importer = bulk_import.Importer(self.author, images)
+        return importer.run(
+            bulk_import.read_rows(io.BytesIO(content), bulk_import.NDJSON)
+        )
+
+    def test_errors_are_reported_per_row(self):
+        report = self.run_ndjson([
+            self.row('Первый'),
+            b'{broken',
+            self.row('Третий', tags=['nope'], cooking_time=0),
+            [1, 2],
+            self.row('Пятый', ingredients=[{'id': self.salt.pk, 'amount': 1}]),
+        ])
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['failed'], 3)
+        self.assertEqual(
+            [error['row'] for error in report['errors']], [2, 3, 4]
+        )
+        self.assertEqual(
+            set(report['errors'][1]['errors']), {'tags', 'cooking_time'}
+        )
+        self.assertEqual(
+            set(Recipe.objects.values_list('name', flat=True)),
+            {'Первый', 'Пятый'},
+        )
+
+    def test_csv_non_ascii_digits_are_row_errors(self):
+        content = (
+            'name,text,cooking_time,tags,ingredients,image\n'
+            'Один,текст,10,²,²:5,a.png\n'
+        ).encode()
+        report = bulk_import.Importer(self.author).run(
+            bulk_import.read_rows(io.BytesIO(content), bulk_import.CSV)
+        )
+        self.assertEqual(report['failed'], 1)
+        errors = report['errors'][0]['errors']
+        self.assertIn('tags', errors)
+        self.assertIn('ingredients', errors)
+
+    def test_corrupt_archive_entry_is_row_error(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('broken.png', png() * 20)
+            archive.writestr('good.png', png())
+        data = bytearray(buffer.getvalue())
+        start = data.index(b'broken.png') + len('broken.png')
+        for index in range(start + 10, start + 40):
+            data[index] ^= 0xFF
+        images = bulk_import.ImageArchive(io.BytesIO(bytes(data)))
+        report = self.run_ndjson(
+            [
+                self.row('Битый', image='broken.png'),
+                self.row('Целый', image='good.png'),
+            ],
+            images,
+        )
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'][0]['row'], 1)
+        self.assertIn('image', report['errors'][0]['errors'])
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        create = bulk_import.Importer._create
+
+        def failing_create(importer, items):
+            if any(item.recipe.name == 'Сбойный' for item in items):
+                raise DatabaseError('сбой записи')
+            return create(importer, items)
+
+        with mock.patch.object(
+            bulk_import.Importer, '_create', failing_create
+        ):
+            report = self.run_ndjson([
+                self.row('Первый'), self.row('Сбойный'), self.row('Третий'),
+            ])
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(report['errors'], [
+            {'row': 2, 'errors': {'non_field_errors': ['сбой записи']}},
+        ])
+        self.assertEqual(
+            set(Recipe.objects.values_list('name', flat=True)),
+            {'Первый', 'Третий'},
+        )
+        self.assertEqual(
+            sorted(report['ids']),
+            sorted(Recipe.objects.values_list('pk', flat=True)),
+        )
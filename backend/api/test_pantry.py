@@ -0,0 +1,116 @@
+"""Инвертированный индекс recipes.pantry."""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from recipes import pantry
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            RecipePosting, Tag)
+
+
+class ContainerTests(SimpleTestCase):
+
+    def bitmap(self, count, step=1):
+        bitmap = 0
+        for position in range(0, count * step, step):
+            bitmap |= 1 << position
+        return bitmap
+
+    def test_small_block_is_array(self):
+        bitmap = self.bitmap(pantry.ARRAY_MAX - 1, step=7)
+        data = pantry.encode(bitmap)
+        self.assertEqual(len(data), 2 * (pantry.ARRAY_MAX - 1))
+        self.assertEqual(pantry.decode(data), bitmap)
+
+    def test_block_switches_to_bitmap_at_array_max(self):
+        bitmap = self.bitmap(pantry.ARRAY_MAX, step=7)
+        data = pantry.encode(bitmap)
+        self.assertEqual(len(data), pantry.BITMAP_BYTES)
+        self.assertEqual(pantry.decode(data), bitmap)
+
+    def test_pack_matches_encode(self):
+        for count in (0, 1, pantry.ARRAY_MAX - 1, pantry.ARRAY_MAX):
+            positions = list(range(0, count * 3, 3))
+            bitmap = self.bitmap(count, step=3)
+            self.assertEqual(pantry._pack(positions), pantry.encode(bitmap))
+
+    def test_edge_positions(self):
+        bitmap = 1 | 1 << pantry.CHUNK_SIZE - 1
+        self.assertEqual(pantry.decode(pantry.encode(bitmap)), bitmap)
+        self.assertEqual(pantry.decode(pantry.encode(pantry.FULL)),
+                         pantry.FULL)
+
+
+class IndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(
+            email='cook@example.com', username='cook', password='x',
+            first_name='C', last_name='K',
+        )
+        cls.tag = Tag.objects.create(name='Ужин', slug='dinner')
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'мука', 'яйцо')
+        ]
+        cls.recipes = []
+        for count in (1, 2, 3):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {count}', text='текст',
+                cooking_time=10, image='recipes/r.png',
+            )
+            recipe.tags.set([cls.tag])
+            for ingredient in cls.ingredients[:count]:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+            cls.recipes.append(recipe)
+        pantry.rebuild_chunk(0)
+
+    def postings(self):
+        return {
+            (posting.kind, posting.key): pantry.decode(posting.data)
+            for posting in RecipePosting.objects.all()
+            if pantry.decode(posting.data)
+        }
+
+    def assertMatchesRebuild(self):
+        live = self.postings()
+        pantry.rebuild_chunk(0)
+        self.assertEqual(live, self.postings())
+
+    def test_search(self):
+        salt, flour, _ = self.ingredients
+        matches = pantry.search([salt.pk, flour.pk], max_missing=1)
+        self.assertEqual(
+            [recipe_id for recipe_id, _, _ in matches[:10]],
+            [self.recipes[1].pk, self.recipes[0].pk, self.recipes[2].pk],
+        )
+
+    def test_update_recipe(self):
+        recipe = self.recipes[2]
+        old_keys = pantry.recipe_keys(recipe.pk)
+        RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient=self.ingredients[0]
+        ).delete()
+        pantry.update_recipe(recipe.pk, old_keys)
+        self.assertMatchesRebuild()
+
+    def test_ingredient_deletion_updates_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.filter(
+                pk__in=[self.ingredients[0].pk, self.ingredients[1].pk]
+            ).delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(RecipePosting.objects.filter(
+            kind=pantry.INGREDIENT, key=self.ingredients[0].pk
+        ).exists())
+
+    def test_tag_deletion_updates_index(self):
+        tag_id = self.tag.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.filter(pk=tag_id).delete()
+        self.assertFalse(RecipePosting.objects.filter(
+            kind=pantry.TAG, key=tag_id
+        ).exists())
+        self.assertMatchesRebuild()
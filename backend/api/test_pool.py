@@ -0,0 +1,88 @@
+"""Пул соединений foodgram_backend.db.pool."""
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from foodgram_backend.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def get_transaction_status(self):
+        return 0
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch(
+            'foodgram_backend.db.pool.time.monotonic', lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = ConnectionPool(
+            MAX_SIZE=2, TIMEOUT=0.01, MAX_LIFETIME=60.0
+        )
+
+    def test_checkout_reuses_returned_connection(self):
+        conn = self.pool.checkout(FakeConnection)
+        self.pool.checkin(conn)
+        self.assertIs(self.pool.checkout(FakeConnection), conn)
+        stats = self.pool.stats()
+        self.assertEqual(stats['connects'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_checkout_times_out_when_pool_is_full(self):
+        self.pool.checkout(FakeConnection)
+        self.pool.checkout(FakeConnection)
+        with mock.patch('foodgram_backend.db.pool.time.monotonic') as clock:
+            clock.side_effect = [self.now, self.now + 1]
+            with self.assertRaises(PoolTimeout):
+                self.pool.checkout(FakeConnection)
+        self.assertEqual(self.pool.stats()['timeouts'], 1)
+
+    def test_failed_connect_frees_slot(self):
+        def connect():
+            raise OSError('connection refused')
+
+        with self.assertRaises(OSError):
+            self.pool.checkout(connect)
+        self.assertEqual(self.pool.stats()['size'], 0)
+
+    def test_connection_older_than_max_lifetime_is_recycled(self):
+        conn = self.pool.checkout(FakeConnection)
+        self.pool.checkin(conn)
+        self.now += 61
+        fresh = self.pool.checkout(FakeConnection)
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        stats = self.pool.stats()
+        self.assertEqual(stats['recycles'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_expired_connection_is_closed_on_checkin(self):
+        conn = self.pool.checkout(FakeConnection)
+        self.now += 61
+        self.pool.checkin(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.stats()['size'], 0)
+
+    def test_fork_drops_parent_connections_without_closing(self):
+        conn = self.pool.checkout(FakeConnection)
+        self.pool.checkin(conn)
+        with mock.patch('foodgram_backend.db.pool.os.getpid') as getpid:
+            getpid.return_value = -1
+            child = self.pool.checkout(FakeConnection)
+        self.assertIsNot(child, conn)
+        self.assertFalse(conn.closed)
+        stats = self.pool.stats()
+        self.assertEqual(stats['connects'], 1)
+        self.assertEqual(stats['size'], 1)
@@ -0,0 +1,64 @@
+"""Маршрутизация чтений между основной базой и репликой."""
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.views import CustomAuthToken
+from foodgram_backend.db.router import ReplicaRoutingMiddleware
+from recipes.models import Recipe
+from recipes.views import RecipeViewSet
+
+GATEWAY = '172.18.0.5'
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica_0'],
+    REPLICA_STICKY_SECONDS=60,
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'router-tests',
+    }},
+)
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(lambda request: None)
+        self.recipes = RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+
+    def request(self, method, client_ip, status=200, view=None, **headers):
+        """Проходит запрос через middleware; возвращает базу для чтения."""
+        request = getattr(self.factory, method)(
+            '/api/recipes/', REMOTE_ADDR=GATEWAY,
+            HTTP_X_FORWARDED_FOR=client_ip, **headers,
+        )
+        self.middleware.process_view(request, view or self.recipes, (), {})
+        alias = router.db_for_read(Recipe)
+        self.middleware.process_response(request, HttpResponse(status=status))
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+        return alias
+
+    def test_safe_request_reads_from_replica(self):
+        self.assertEqual(self.request('get', '10.0.0.1'), 'replica_0')
+
+    def test_other_views_read_from_primary(self):
+        view = CustomAuthToken.as_view()
+        self.assertEqual(self.request('get', '10.0.0.1', view=view), 'default')
+
+    def test_anonymous_write_pins_only_that_client(self):
+        self.request('post', '10.0.0.1')
+        self.assertEqual(self.request('get', '10.0.0.1'), 'default')
+        self.assertEqual(self.request('get', '10.0.0.2'), 'replica_0')
+
+    def test_failed_write_does_not_pin(self):
+        self.request('post', '10.0.0.1', status=400)
+        self.assertEqual(self.request('get', '10.0.0.1'), 'replica_0')
+
+    def test_authorized_write_pins_token(self):
+        token = {'HTTP_AUTHORIZATION': 'Token abc'}
+        self.request('post', '10.0.0.1', **token)
+        self.assertEqual(self.request('get', '10.0.0.3', **token), 'default')
+        self.assertEqual(self.request('get', '10.0.0.1'), 'replica_0')
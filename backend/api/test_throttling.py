@@ -0,0 +1,77 @@
+"""Token bucket api.throttling в разделяемой памяти."""
+import hashlib
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.throttling import SharedMemoryBuckets, parse_rate
+
+
+class SharedMemoryBucketsTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'throttle')
+        self.now = 1000.0
+        patcher = mock.patch(
+            'api.throttling.time.time', lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buckets = SharedMemoryBuckets(self.path, 64)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('60/min'), (60, 1.0))
+        self.assertEqual(parse_rate('10/s'), (10, 10.0))
+
+    def test_bucket_allows_burst_then_waits(self):
+        for _ in range(3):
+            self.assertEqual(self.buckets.take('anon:a', 3, 0.5), 0)
+        self.assertEqual(self.buckets.take('anon:a', 3, 0.5), 2.0)
+        self.assertEqual(self.buckets.take('anon:b', 3, 0.5), 0)
+
+    def test_bucket_refills_over_time(self):
+        for _ in range(3):
+            self.buckets.take('anon:a', 3, 0.5)
+        self.now += 1
+        self.assertAlmostEqual(self.buckets.take('anon:a', 3, 0.5), 1.0)
+        self.now += 1
+        self.assertEqual(self.buckets.take('anon:a', 3, 0.5), 0)
+        self.assertEqual(self.buckets.take('anon:a', 3, 0.5), 2.0)
+        # Дольше, чем нужно на полную корзину, копится не больше ёмкости.
+        self.now += 3600
+        for _ in range(3):
+            self.assertEqual(self.buckets.take('anon:a', 3, 0.5), 0)
+        self.assertEqual(self.buckets.take('anon:a', 3, 0.5), 2.0)
+
+    def test_buckets_are_shared_between_handles(self):
+        self.buckets.take('user:1', 1, 0.1)
+        other = SharedMemoryBuckets(self.path, 64)
+        self.assertGreater(other.take('user:1', 1, 0.1), 0)
+
+    def test_slot_lock_serializes_processes(self):
+        capacity, takes = 10_000, 2000
+        self.buckets.take('anon:c', capacity, 0.001)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                for _ in range(takes):
+                    self.buckets.take('anon:c', capacity, 0.001)
+            finally:
+                os._exit(0)
+        for _ in range(takes):
+            self.buckets.take('anon:c', capacity, 0.001)
+        os.waitpid(pid, 0)
+        _, tokens, _ = self.buckets.slot.unpack_from(
+            self.buckets._map, self._offset('anon:c')
+        )
+        self.assertEqual(tokens, capacity - 1 - 2 * takes)
+
+    def _offset(self, key):
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little'
+        )
+        return digest % self.buckets.slots * self.buckets.slot.size
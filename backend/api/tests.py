@@ -0,0 +1,22 @@
+"""Планы горячих запросов API (manage.py index_advisor)."""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .management.commands.index_advisor import PATHS
+
+
+class IndexAdvisorTests(TestCase):
+    """Горячие пути читают по индексам, без сканирований и сортировок."""
+
+    def test_hot_paths_use_indexes(self):
+        out = StringIO()
+        try:
+            call_command('index_advisor', '--check', stdout=out)
+        except CommandError as error:
+            self.fail(f'{error}\n{out.getvalue()}')
+        for path in PATHS:
+            with self.subTest(path=path.name):
+                self.assertIn(f'OK    {path.name}', out.getvalue())
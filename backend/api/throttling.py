@@ -0,0 +1,182 @@
+"""
+Ограничение частоты запросов по алгоритму token bucket.
+
+Корзина заводится на пару (scope, пользователь или IP). Ёмкость и
+скорость пополнения задаются строкой вида '60/min' в
+DEFAULT_THROTTLE_RATES: клиент может сделать 60 запросов подряд,
+дальше — по одному раз в секунду. Состояние хранится вне процесса,
+поэтому лимит общий для всех воркеров gunicorn:
+
+* shm (по умолчанию) — таблица корзин в файле, отображённом в память
+  (/dev/shm), каждый слот блокируется через fcntl;
+* redis — Redis-совместимый сервер, корзина обновляется Lua-скриптом
+  атомарно; нужен, если бэкенд запущен на нескольких хостах.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'60/min' -> (ёмкость, токенов в секунду)."""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class SharedMemoryBuckets:
+    """
+    Таблица корзин фиксированного размера в разделяемой памяти.
+
+    Слот (хеш ключа, токены, время обновления) выбирается по хешу
+    ключа. При коллизии корзина начинается заново: лимит для одного
+    из клиентов ненадолго ослабевает, но никогда не ужесточается.
+    """
+
+    local = True
+    slot = struct.Struct('=Qdd')
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self._map = None
+        # fcntl-блокировки принадлежат процессу, потоки разделяем отдельно.
+        self._lock = threading.Lock()
+
+    def _open(self):
+        size = self.slots * self.slot.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._fd = fd
+        self._map = mmap.mmap(fd, size)
+
+    def take(self, key, capacity, refill):
+        """Забирает токен. Возвращает 0 или время ожидания в секундах."""
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little'
+        ) or 1
+        offset = digest % self.slots * self.slot.size
+        with self._lock:
+            if self._map is None:
+                self._open()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot.size, offset)
+            try:
+                stored, tokens, updated = self.slot.unpack_from(
+                    self._map, offset
+                )
+                now = time.time()
+                if stored != digest:
+                    tokens = capacity
+                else:
+                    tokens = min(
+                        capacity, tokens + max(now - updated, 0) * refill
+                    )
+                wait = 0 if tokens >= 1 else (1 - tokens) / refill
+                if not wait:
+                    tokens -= 1
+                self.slot.pack_into(self._map, offset, digest, tokens, now)
+                return wait
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot.size, offset)
+
+
+class RedisBuckets:
+    """Корзины в Redis-совместимом хранилище."""
+
+    local = False
+    script = """
+        local capacity = tonumber(ARGV[1])
+        local refill = tonumber(ARGV[2])
+        local now = tonumber(ARGV[3])
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = capacity
+        if state[1] then
+            local elapsed = math.max(now - tonumber(state[2]), 0)
+            tokens = math.min(capacity, tonumber(state[1]) + elapsed * refill)
+        end
+        local wait = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            wait = (1 - tokens) / refill
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+        redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill) + 1)
+        return tostring(wait)
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self._take = redis.Redis.from_url(url).register_script(self.script)
+
+    def take(self, key, capacity, refill):
+        return float(self._take(
+            keys=[f'throttle:{key}'], args=[capacity, refill, time.time()]
+        ))
+
+
+@lru_cache(maxsize=None)
+def get_store():
+    if settings.THROTTLE_STORE == 'redis':
+        return RedisBuckets(settings.THROTTLE_REDIS_URL)
+    return SharedMemoryBuckets(
+        settings.THROTTLE_STORE_PATH, settings.THROTTLE_STORE_SLOTS
+    )
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Лимит для throttle_scope view (или её action), иначе общий
+    'user'/'anon'. Scope без ставки в DEFAULT_THROTTLE_RATES
+    не ограничивается.
+    """
+
+    def allow_request(self, request, view):
+        self._wait = None
+        user = request.user
+        if user.is_authenticated:
+            scope = getattr(view, 'throttle_scope', None) or 'user'
+            ident = f'user:{user.pk}'
+        else:
+            scope = getattr(view, 'throttle_scope', None) or 'anon'
+            ident = f'ip:{self.get_ident(request)}'
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        self._wait = get_store().take(f'{scope}:{ident}', *parse_rate(rate))
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+def throttle_wait(request, view):
+    """
+    Проверка throttle-классов view вне DRF (для async-view).
+    Возвращает None, если запрос разрешён, иначе время ожидания.
+    """
+    durations = [
+        throttle.wait()
+        for throttle in view.get_throttles()
+        if not throttle.allow_request(request, view)
+    ]
+    if not durations:
+        return None
+    return max(
+        (duration for duration in durations if duration is not None),
+        default=0,
+    )
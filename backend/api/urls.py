@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from recipes.views import IngredientViewSet, RecipeViewSet, TagViewSet
 
-from .views import CustomAuthToken, UserViewSet, logout_view
+from .async_views import async_urlpatterns
+from .views import CustomAuthToken, UserViewSet, db_pool_view, logout_view
 
 router_v1 = DefaultRouter()
 router_v1.register(r'users', UserViewSet, basename='users')
@@ -16,7 +18,18 @@ auth_urls = [
     path('auth/token/logout/', logout_view, name='logout'),
 ]
 
+internal_urls = [
+    path('internal/db-pool/', db_pool_view, name='db-pool'),
+]
+
 urlpatterns = [
     path('', include(auth_urls)),
+    path('', include(internal_urls)),
+]
+
+if settings.ASYNC_API:
+    urlpatterns += async_urlpatterns(router_v1)
+
+urlpatterns += [
     path('', include(router_v1.urls)),
 ]
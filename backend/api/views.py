@@ -2,19 +2,26 @@ import base64
 import uuid
 
 from django.core.files.base import ContentFile
-from rest_framework import filters, status, viewsets
+from rest_framework import status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
 
+from foodgram_backend.db.pool import pool_stats
+from foodgram_backend.fuzzy_search import FuzzySearchFilter
+from foodgram_backend.metrics import image_timer
+from foodgram_backend.server_timing import ServerTimingMixin
 from foodgram_backend.settings import USER_ME_URL_SEGMENT
+from recipes import feed
 
 from .constants import USERS_PAGINATION_PAGE_SIZE
 from .models import User
+from .parsers import ORJSONParser
 from .permissions import IsAdmin
 from .serializers import (AdminUserSerializer, AvatarSerializer,
                           ChangePasswordSerializer, EmailAuthTokenSerializer,
@@ -22,7 +29,7 @@ from .serializers import (AdminUserSerializer, AvatarSerializer,
                           SubscriptionDetailSerializer, UserReadSerializer)
 
 
-class CustomAuthToken(ObtainAuthToken):
+class CustomAuthToken(ServerTimingMixin, ObtainAuthToken):
     """Вход по email/паролю, возвращает токен."""
 
     serializer_class = EmailAuthTokenSerializer
@@ -47,21 +54,29 @@ def logout_view(request):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_pool_view(request):
+    """Метрики пула соединений с БД текущего воркера."""
+
+    return Response(pool_stats())
+
+
 class UsersPagination(PageNumberPagination):
     page_size = USERS_PAGINATION_PAGE_SIZE
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ServerTimingMixin, viewsets.ModelViewSet):
     """ViewSet для пользователей: регистрация, профиль, подписки."""
 
     queryset = User.objects.all()
     serializer_class = AdminUserSerializer
     lookup_field = 'id'
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FuzzySearchFilter]
     search_fields = ['username']
     pagination_class = UsersPagination
     permission_classes = (IsAdmin,)
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (MultiPartParser, FormParser, ORJSONParser)
     http_method_names = [
         'get', 'put', 'post', 'patch', 'delete', 'head', 'options'
     ]
@@ -179,12 +194,15 @@ class UserViewSet(viewsets.ModelViewSet):
                     {'detail': 'Нельзя подписаться на себя'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            user.follower.get_or_create(author=author)
+            _, created = user.follower.get_or_create(author=author)
+            if created:
+                feed.follow(user, author)
             serializer = self.get_serializer(
                 author, context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         user.follower.filter(author=author).delete()
+        feed.unfollow(user, author)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['get'], url_path='subscriptions')
@@ -228,14 +246,16 @@ class UserViewSet(viewsets.ModelViewSet):
             header, b64 = avatar_data.split(';base64,', 1)
             ext = header.split('/')[-1]
             try:
-                decoded = base64.b64decode(b64)
+                with image_timer('avatar', 'decode'):
+                    decoded = base64.b64decode(b64)
             except (TypeError, ValueError):
                 return Response(
                     {'avatar': 'Некорректный base64.'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
             file_name = f'{uuid.uuid4()}.{ext}'
-            user.avatar.save(file_name, ContentFile(decoded), save=True)
+            with image_timer('avatar', 'save'):
+                user.avatar.save(file_name, ContentFile(decoded), save=True)
 
         else:
             avatar_file = request.FILES.get('avatar')
@@ -244,7 +264,8 @@ class UserViewSet(viewsets.ModelViewSet):
                     {'avatar': 'Неправильный формат avatar.'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            user.avatar.save(avatar_file.name, avatar_file, save=True)
+            with image_timer('avatar', 'save'):
+                user.avatar.save(avatar_file.name, avatar_file, save=True)
 
         return Response(
             {'avatar': request.build_absolute_uri(user.avatar.url)}
@@ -0,0 +1,150 @@
+"""
+Уборка файлов и больших каскадов удаления.
+
+Файлы полей, подключённых через register(), удаляются из хранилища
+после фиксации транзакции, в которой строку удалили или заменили
+файл, и только если на то же имя не ссылается другая строка. Файлы,
+оставшиеся от прежних версий, транзакций с откатом и удалений в
+обход ORM, находит sweep(): каталоги полей обходятся scandir без
+полного списка, имена сверяются с базой пакетами по
+MEDIA_SWEEP_BATCH_SIZE. Файлы моложе grace секунд не трогаются:
+их строка может быть ещё не зафиксирована.
+
+delete_in_chunks() удаляет строки пакетами в отдельных транзакциях,
+чтобы каскад большого удаления не держал блокировки долго.
+"""
+import os
+import time
+
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from api.constants import (CLEANUP_CHUNK_SIZE, MEDIA_SWEEP_BATCH_SIZE,
+                           MEDIA_SWEEP_GRACE)
+
+_fields = {}
+
+
+def delete_file(model, field, name, using):
+    """Удаляет файл name поля field после фиксации транзакции."""
+    def delete():
+        if not model._default_manager.using(using).filter(
+            **{field: name}
+        ).exists():
+            model._meta.get_field(field).storage.delete(name)
+
+    transaction.on_commit(delete, using=using)
+
+
+def _remember_files(sender, instance, using, raw=False, update_fields=None,
+                    **kwargs):
+    fields = [
+        field for field in _fields[sender]
+        if not update_fields or field in update_fields
+    ]
+    if raw or instance._state.adding or instance.pk is None or not fields:
+        return
+    instance._cleanup_files = sender._default_manager.using(using).filter(
+        pk=instance.pk
+    ).values(*fields).first()
+
+
+def _delete_replaced(sender, instance, using, **kwargs):
+    old = instance.__dict__.pop('_cleanup_files', None) or {}
+    for field, name in old.items():
+        if name and name != getattr(instance, field).name:
+            delete_file(sender, field, name, using)
+
+
+def _delete_removed(sender, instance, using, **kwargs):
+    for field in _fields[sender]:
+        name = getattr(instance, field).name
+        if name:
+            delete_file(sender, field, name, using)
+
+
+def register(model, *fields):
+    """Подключает удаление файлов полей fields модели."""
+    _fields[model] = fields
+    pre_save.connect(_remember_files, sender=model)
+    post_save.connect(_delete_replaced, sender=model)
+    post_delete.connect(_delete_removed, sender=model)
+
+
+def delete_in_chunks(queryset, chunk_size=CLEANUP_CHUNK_SIZE):
+    """
+    Удаляет строки queryset пакетами по chunk_size, каждый в своей
+    транзакции. Возвращает число удалённых строк вместе с каскадом.
+    """
+    using = router.db_for_write(queryset.model)
+    queryset = queryset.using(using).order_by('pk')
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        with transaction.atomic(using=using):
+            count, _ = queryset.model._default_manager.using(using).filter(
+                pk__in=pks
+            ).delete()
+        deleted += count
+
+
+def _walk(path):
+    """Файлы (DirEntry) под path; каталоги читаются по одному."""
+    directories = [path]
+    while directories:
+        try:
+            entries = os.scandir(directories.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def _sweep_batch(model, field, storage, batch, dry_run):
+    known = set(
+        model._default_manager.filter(
+            **{f'{field}__in': batch}
+        ).values_list(field, flat=True)
+    )
+    orphans = [name for name in batch if name not in known]
+    if not dry_run:
+        for name in orphans:
+            storage.delete(name)
+    return orphans
+
+
+def sweep_field(model, field, grace=MEDIA_SWEEP_GRACE, dry_run=False,
+                batch_size=MEDIA_SWEEP_BATCH_SIZE):
+    """Имена файлов каталога поля, на которые не ссылается ни одна строка."""
+    model_field = model._meta.get_field(field)
+    storage = model_field.storage
+    upload_to = model_field.upload_to
+    if callable(upload_to) or not hasattr(storage, 'location'):
+        return
+    root = storage.location
+    cutoff = time.time() - grace
+    batch = []
+    for entry in _walk(os.path.join(root, upload_to.partition('%')[0])):
+        if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+            continue
+        batch.append(
+            os.path.relpath(entry.path, root).replace(os.sep, '/')
+        )
+        if len(batch) >= batch_size:
+            yield from _sweep_batch(model, field, storage, batch, dry_run)
+            batch = []
+    if batch:
+        yield from _sweep_batch(model, field, storage, batch, dry_run)
+
+
+def sweep(grace=MEDIA_SWEEP_GRACE, dry_run=False):
+    """Удаляет (dry_run — только находит) потерянные файлы всех полей."""
+    for model, fields in _fields.items():
+        for field in fields:
+            yield from sweep_field(model, field, grace, dry_run)
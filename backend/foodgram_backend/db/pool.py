@@ -0,0 +1,189 @@
+"""
+Пул соединений с БД внутри процесса.
+
+Соединения переиспользуются между запросами и потоками (ASGI),
+поэтому установка TCP-соединения и аутентификация не попадают
+в латентность запроса. Перед выдачей соединение, простаивавшее
+дольше HEALTH_CHECK_INTERVAL, проверяется запросом SELECT 1;
+соединения старше MAX_LIFETIME пересоздаются.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULTS = {
+    'MAX_SIZE': 10,
+    'TIMEOUT': 5.0,
+    'MAX_LIFETIME': 1800.0,
+    'MAX_IDLE': 300.0,
+    'HEALTH_CHECK_INTERVAL': 30.0,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за TIMEOUT секунд."""
+
+
+class ConnectionPool:
+    """Потокобезопасный LIFO-пул DB-API соединений."""
+
+    def __init__(self, **options):
+        options = {**DEFAULTS, **options}
+        self.max_size = options['MAX_SIZE']
+        self.timeout = options['TIMEOUT']
+        self.max_lifetime = options['MAX_LIFETIME']
+        self.max_idle = options['MAX_IDLE']
+        self.health_check_interval = options['HEALTH_CHECK_INTERVAL']
+        self._lock = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._born = {}
+        self._size = 0
+        self._stats = {
+            'checkouts': 0,
+            'connects': 0,
+            'recycles': 0,
+            'discards': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def _check_fork(self):
+        # После fork соединения родителя использовать нельзя,
+        # закрывать их тоже: это оборвёт их в родительском процессе.
+        if self._pid != os.getpid():
+            self._reset()
+
+    def checkout(self, connect):
+        """Выдаёт соединение; connect() открывает новое при нехватке."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            conn = None
+            with self._lock:
+                self._check_fork()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'Нет свободного соединения за {self.timeout} с.'
+                        )
+                    self._lock.wait(remaining)
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    self._size += 1
+            if conn is None:
+                conn = self._open(connect)
+            elif not self._usable(conn, returned_at):
+                self._discard(conn)
+                continue
+            waited = time.monotonic() - started
+            with self._lock:
+                self._stats['checkouts'] += 1
+                self._stats['wait_time_total'] += waited
+                self._stats['wait_time_max'] = max(
+                    self._stats['wait_time_max'], waited
+                )
+            return conn
+
+    def checkin(self, conn):
+        with self._lock:
+            self._check_fork()
+        if conn.closed or self._expired(conn):
+            self._discard(conn)
+            return
+        try:
+            if conn.get_transaction_status() != 0:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        now = time.monotonic()
+        stale = []
+        with self._lock:
+            self._idle.append((conn, now))
+            while self._idle and now - self._idle[0][1] > self.max_idle:
+                stale.append(self._idle.popleft()[0])
+            self._lock.notify()
+        for conn in stale:
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def _open(self, connect):
+        try:
+            conn = connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._born[id(conn)] = time.monotonic()
+            self._stats['connects'] += 1
+        return conn
+
+    def _expired(self, conn):
+        born = self._born.get(id(conn), 0)
+        return time.monotonic() - born > self.max_lifetime
+
+    def _usable(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if self._expired(conn):
+            with self._lock:
+                self._stats['recycles'] += 1
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if conn.get_transaction_status() != 0:
+                conn.rollback()
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._born.pop(id(conn), None)
+            self._size -= 1
+            self._stats['discards'] += 1
+            self._lock.notify()
+
+
+def get_pool(alias, options):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(**options)
+        return _pools[alias]
+
+
+def pool_stats():
+    """Метрики всех пулов текущего процесса по алиасам БД."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
@@ -0,0 +1,29 @@
+"""
+Бэкенд PostgreSQL с пулом соединений внутри процесса.
+
+Подключается через ENGINE = 'foodgram_backend.db.postgresql',
+параметры пула задаются в DATABASES[alias]['POOL'].
+Закрытие соединения Django возвращает его в пул.
+"""
+from functools import partial
+
+from django.db.backends.postgresql import base
+
+from ..pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL', {}))
+
+    def get_new_connection(self, conn_params):
+        return self.pool.checkout(
+            partial(super().get_new_connection, conn_params)
+        )
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.checkin(self.connection)
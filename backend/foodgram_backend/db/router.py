@@ -0,0 +1,76 @@
+"""
+Маршрутизация запросов к БД между основной базой и репликами.
+
+Безопасные (GET/HEAD/OPTIONS) запросы к view из READ_REPLICA_VIEWS
+читают из случайной реплики, выбранной на весь запрос. Запись и
+любые чтения вне этих view идут в основную базу. После успешного
+небезопасного запроса клиент на REPLICA_STICKY_SECONDS закрепляется
+за основной базой, чтобы не увидеть из реплики устаревшие избранное
+и корзину. Клиент определяется по заголовку Authorization, без него —
+по адресу из X-Forwarded-For с учётом NUM_PROXIES, как в throttling:
+REMOTE_ADDR за gateway один на всех.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+class PrimaryReplicaRouter:
+    """Чтение из реплики, выбранной ReplicaRoutingMiddleware."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def _sticky_key(request):
+    credentials = request.headers.get('Authorization') or (
+        f'ip:{BaseThrottle().get_ident(request)}'
+    )
+    digest = hashlib.sha1(credentials.encode()).hexdigest()
+    return f'db-sticky:{digest}'
+
+
+def _view_path(view_func):
+    view = getattr(view_func, 'cls', view_func)
+    return f'{view.__module__}.{view.__qualname__}'
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and _view_path(view_func) in settings.READ_REPLICA_VIEWS
+            and not cache.get(_sticky_key(request))
+        ):
+            _read_alias.set(random.choice(settings.DATABASE_REPLICAS))
+
+    def process_response(self, request, response):
+        _read_alias.set(None)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            cache.set(
+                _sticky_key(request), True, settings.REPLICA_STICKY_SECONDS
+            )
+        return response
@@ -0,0 +1,190 @@
+"""
+Журнал медленных SQL-запросов.
+
+Запросы дольше SLOW_QUERY_THRESHOLD_MS с вероятностью
+SLOW_QUERY_SAMPLE_RATE записываются строкой JSON в
+SLOW_QUERY_DIR/slow_queries.jsonl: отпечаток (SQL без литералов
+и с IN-списками любой длины, сведёнными к одному), время, view,
+сериализатор и место вызова в коде. Для SELECT, ставшего самым
+медленным среди своего отпечатка или не разбиравшегося дольше
+SLOW_QUERY_EXPLAIN_INTERVAL секунд, снимается план
+EXPLAIN (ANALYZE, BUFFERS); в SQLite — EXPLAIN QUERY PLAN.
+Файл ротируется по размеру. Отчёт — manage.py slow_queries.
+"""
+import fcntl
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+
+import orjson
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+
+LOG_NAME = 'slow_queries.jsonl'
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+EXPLAIN = {
+    'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+PROJECT_DIR = str(settings.BASE_DIR)
+SKIPPED_MODULES = ('foodgram_backend.db.', 'foodgram_backend.metrics')
+
+_explaining = ContextVar('explaining', default=False)
+_explained = {}
+_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """Нормализованный SQL и короткий хеш для группировки."""
+    normalized = sql.replace('%s', '?')
+    normalized = STRING_LITERAL.sub('?', normalized)
+    normalized = NUMBER.sub('?', normalized)
+    normalized = PLACEHOLDER_LIST.sub('(...)', normalized)
+    normalized = WHITESPACE.sub(' ', normalized).strip()
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+    return digest, normalized
+
+
+def _origin():
+    """View, сериализатор и ближайшая строка кода проекта в стеке."""
+    from rest_framework.serializers import BaseSerializer
+    from rest_framework.views import APIView
+
+    view = serializer = location = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', '')
+        if location is None and code.co_filename.startswith(PROJECT_DIR) and (
+            not module.startswith(SKIPPED_MODULES)
+        ):
+            location = f'{module}:{frame.f_lineno} {code.co_name}'
+        owner = frame.f_locals.get('self')
+        if serializer is None and isinstance(owner, BaseSerializer):
+            serializer = type(getattr(owner, 'child', owner)).__name__
+        if view is None and isinstance(owner, APIView):
+            action = getattr(owner, 'action', None)
+            view = type(owner).__name__ + (f'.{action}' if action else '')
+            break
+        frame = frame.f_back
+    return view, serializer, location
+
+
+def _should_explain(digest, duration, sql, many):
+    if many or not settings.SLOW_QUERY_EXPLAIN:
+        return False
+    if sql.lstrip()[:6].upper() != 'SELECT':
+        return False
+    now = time.monotonic()
+    with _lock:
+        worst, explained_at = _explained.get(digest, (0, None))
+        if explained_at is not None and duration <= worst and (
+            now - explained_at < settings.SLOW_QUERY_EXPLAIN_INTERVAL
+        ):
+            return False
+        _explained[digest] = (max(worst, duration), now)
+    return True
+
+
+def _explain(connection, sql, params):
+    prefix = EXPLAIN.get(connection.vendor)
+    if prefix is None:
+        return None
+    token = _explaining.set(True)
+    try:
+        # Savepoint: ошибка EXPLAIN не должна прервать транзакцию запроса.
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+    except DatabaseError as error:
+        return f'EXPLAIN failed: {error}'
+    finally:
+        _explaining.reset(token)
+    return '\n'.join(' '.join(map(str, row)) for row in rows)
+
+
+def _rotate(path):
+    for index in range(settings.SLOW_QUERY_BACKUPS - 1, 0, -1):
+        if os.path.exists(f'{path}.{index}'):
+            os.replace(f'{path}.{index}', f'{path}.{index + 1}')
+    os.replace(path, f'{path}.1')
+
+
+def write(record):
+    """Дописывает запись в журнал, при переполнении ротирует его."""
+    os.makedirs(settings.SLOW_QUERY_DIR, exist_ok=True)
+    path = os.path.join(settings.SLOW_QUERY_DIR, LOG_NAME)
+    line = orjson.dumps(record) + b'\n'
+    with open(f'{path}.lock', 'w') as lock:
+        fcntl.lockf(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.getsize(path) + len(line) > (
+                settings.SLOW_QUERY_MAX_BYTES
+            ):
+                _rotate(path)
+        except FileNotFoundError:
+            pass
+        with open(path, 'ab') as log:
+            log.write(line)
+
+
+def log_files():
+    """Файлы журнала от старых к новым."""
+    path = os.path.join(settings.SLOW_QUERY_DIR, LOG_NAME)
+    rotated = [
+        f'{path}.{index}'
+        for index in range(settings.SLOW_QUERY_BACKUPS, 0, -1)
+    ]
+    return [name for name in [*rotated, path] if os.path.exists(name)]
+
+
+def record_slow_query(execute, sql, params, many, context):
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - started) * 1000
+    if duration < settings.SLOW_QUERY_THRESHOLD_MS or (
+        random.random() >= settings.SLOW_QUERY_SAMPLE_RATE
+    ):
+        return result
+    try:
+        digest, normalized = fingerprint(sql)
+        view, serializer, location = _origin()
+        connection = context['connection']
+        plan = None
+        if _should_explain(digest, duration, sql, many):
+            plan = _explain(connection, sql, params)
+        write({
+            'time': time.time(),
+            'fingerprint': digest,
+            'sql': normalized,
+            'duration_ms': round(duration, 3),
+            'database': connection.alias,
+            'view': view,
+            'serializer': serializer,
+            'location': location,
+            'plan': plan,
+        })
+    except OSError:
+        # Журнал — вспомогательный, запрос из-за него падать не должен.
+        pass
+    return result
+
+
+def install(sender, connection, **kwargs):
+    if record_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow_query)
+
+
+connection_created.connect(install)
@@ -0,0 +1,224 @@
+"""
+Нечёткий поиск по строковому полю: ингредиенты по name, пользователи
+по username.
+
+Выдача: сначала строки, начинающиеся с запроса (по алфавиту), затем
+содержащие его или похожие на него по триграммам — по убыванию
+сходства, как similarity() из pg_trgm (порог FUZZY_SEARCH_THRESHOLD
+совпадает с pg_trgm.similarity_threshold по умолчанию). Запрос короче
+FUZZY_SEARCH_MIN_LENGTH ищется только по началу строки: у него почти
+нет триграмм, и нечёткий поиск перебирал бы всю таблицу.
+
+PostgreSQL: % и ILIKE по GIN-индексу gin_trgm_ops на UPPER(поле::text),
+префикс — по btree text_pattern_ops на том же выражении. Остальные
+СУБД (SQLite в разработке и тестах): n-граммный индекс в памяти
+воркера. Он строится при первом поиске и перестраивается, когда
+меняется версия в общем кеше; версию меняют сигналы сохранения и
+удаления моделей, подключённых через register().
+"""
+import re
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import (BooleanField, Case, CharField, ExpressionWrapper,
+                              Func, IntegerField, Q, When)
+from django.db.models.functions import Collate, Lower
+from django.db.models.signals import post_delete, post_save
+from rest_framework.filters import SearchFilter
+
+from api.constants import (FUZZY_SEARCH_MIN_LENGTH, FUZZY_SEARCH_THRESHOLD,
+                           REFERENCE_VERSION_CHECK_INTERVAL)
+
+WORD = re.compile(r'[^\W_]+')
+
+_fields = {}
+_indexes = {}
+_checked = {}
+
+
+class UpperText(Func):
+    """UPPER(поле::text) — выражение индексов под поиск."""
+
+    template = 'UPPER(%(expressions)s::text)'
+    output_field = CharField()
+
+
+def trigrams(text):
+    """Триграммы строки, как их выделяет pg_trgm."""
+    result = set()
+    for word in WORD.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(
+            padded[start:start + 3] for start in range(len(padded) - 2)
+        )
+    return result
+
+
+class NgramIndex:
+    """Триграммный индекс значений одного поля."""
+
+    def __init__(self, rows):
+        self.values = {}
+        self.postings = defaultdict(list)
+        self.ordered = []
+        for pk, value in rows:
+            value = value.lower()
+            grams = trigrams(value)
+            self.values[pk] = (value, len(grams))
+            for gram in grams:
+                self.postings[gram].append(pk)
+            self.ordered.append((value, pk))
+        self.ordered.sort()
+
+    def prefix(self, query):
+        """pk значений, начинающихся с query, по алфавиту."""
+        result = []
+        for value, pk in self.ordered[bisect_left(self.ordered, (query,)):]:
+            if not value.startswith(query):
+                break
+            result.append(pk)
+        return result
+
+    def similar(self, query, exclude):
+        """pk значений, содержащих query или похожих на него."""
+        grams = trigrams(query)
+        common = Counter()
+        for gram in grams:
+            common.update(self.postings.get(gram, ()))
+        ranked = []
+        for pk, count in common.items():
+            if pk in exclude:
+                continue
+            value, size = self.values[pk]
+            similarity = count / (len(grams) + size - count)
+            if similarity >= FUZZY_SEARCH_THRESHOLD or query in value:
+                ranked.append((-similarity, value, pk))
+        ranked.sort()
+        return [pk for _, _, pk in ranked]
+
+
+def _version_key(label):
+    return f'fuzzy-search-version:{label}'
+
+
+def _current_version(label):
+    now = time.monotonic()
+    checked_at, version = _checked.get(label, (None, None))
+    if (
+        checked_at is not None
+        and now - checked_at < REFERENCE_VERSION_CHECK_INTERVAL
+    ):
+        return version
+    version = cache.get(_version_key(label))
+    if version is None:
+        cache.add(_version_key(label), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(label))
+    _checked[label] = (now, version)
+    return version
+
+
+def bump_version(model):
+    """Сбрасывает индексы модели во всех воркерах."""
+    label = model._meta.label
+    version = uuid.uuid4().hex
+    cache.set(_version_key(label), version, None)
+    _checked[label] = (time.monotonic(), version)
+
+
+def _on_change(sender, instance, update_fields=None, **kwargs):
+    field = _fields.get(sender)
+    if field is None or (update_fields and field not in update_fields):
+        return
+    using = router.db_for_write(sender, instance=instance)
+    if connections[using].vendor != 'postgresql':
+        transaction.on_commit(lambda: bump_version(sender), using=using)
+
+
+def register(model, field):
+    """Подключает сброс индекса при изменении поля field модели."""
+    _fields[model] = field
+    post_save.connect(_on_change, sender=model)
+    post_delete.connect(_on_change, sender=model)
+
+
+def _index(model, field):
+    version = _current_version(model._meta.label)
+    cached = _indexes.get((model, field))
+    if cached is None or cached[0] != version:
+        cached = (
+            version,
+            NgramIndex(model._default_manager.values_list('pk', field)),
+        )
+        _indexes[(model, field)] = cached
+    return cached[1]
+
+
+def _postgres_search(queryset, field, query):
+    from django.contrib.postgres.lookups import TrigramSimilar
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    prefix = Q(**{f'{field}__istartswith': query})
+    # По алфавиту, как NgramIndex.prefix: нижний регистр, коды символов.
+    alphabetical = Collate(Lower(field), 'C')
+    if len(query) < FUZZY_SEARCH_MIN_LENGTH:
+        return queryset.filter(prefix).order_by(alphabetical, field)
+    text = UpperText(field)
+    return queryset.filter(
+        Q(**{f'{field}__icontains': query})
+        | Q(TrigramSimilar(text, query.upper()))
+    ).annotate(
+        search_prefix=ExpressionWrapper(prefix, output_field=BooleanField()),
+        search_similarity=TrigramSimilarity(text, query.upper()),
+    ).order_by(
+        '-search_prefix',
+        Case(When(search_prefix=True, then=alphabetical)),
+        '-search_similarity',
+        field,
+    )
+
+
+def search(queryset, field, query, limit=None):
+    """
+    queryset, отфильтрованный по query в поле field и упорядоченный
+    по релевантности; не больше limit строк, если он задан.
+    """
+    query = query.replace('\x00', '').strip()
+    if not query:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        queryset = _postgres_search(queryset, field, query)
+        return queryset[:limit] if limit else queryset
+    index = _index(queryset.model, field)
+    query = query.lower()
+    pks = index.prefix(query)
+    if len(query) >= FUZZY_SEARCH_MIN_LENGTH:
+        pks += index.similar(query, set(pks))
+    if limit:
+        pks = pks[:limit]
+    if not pks:
+        return queryset.none()
+    return queryset.filter(pk__in=pks).order_by(Case(
+        *[When(pk=pk, then=position) for position, pk in enumerate(pks)],
+        output_field=IntegerField(),
+    ))
+
+
+class FuzzySearchFilter(SearchFilter):
+    """
+    SearchFilter с нечётким поиском по первому полю search_fields;
+    view.search_limit ограничивает выдачу.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        fields = self.get_search_fields(view, request)
+        query = request.query_params.get(self.search_param, '')
+        if not fields or not query:
+            return queryset
+        return search(
+            queryset, fields[0].lstrip('^=@$'), query,
+            getattr(view, 'search_limit', None),
+        )
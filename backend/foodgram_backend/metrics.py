@@ -0,0 +1,437 @@
+"""
+Метрики бэкенда в формате Prometheus.
+
+Каждый воркер копит счётчики и гистограммы в памяти процесса
+(запись — словарь под одним lock) и не чаще раза в FLUSH_INTERVAL
+секунд, в конце очередного запроса, сбрасывает снимок в файл
+METRICS_DIR/<pid>.json. Эндпоинт /metrics суммирует снимки всех
+воркеров. Снимки завершившихся воркеров переносятся в archive.json,
+чтобы счётчики не уменьшались после перезапуска воркеров; их gauge
+(состояние пула соединений) отбрасываются.
+"""
+import atexit
+import fcntl
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+import orjson
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .db.pool import pool_stats
+from .server_timing import measure
+
+FLUSH_INTERVAL = 1.0
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SERIALIZER_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1
+)
+IMAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+METRICS = {
+    'foodgram_http_requests_total': (
+        'counter', 'HTTP-запросы по маршруту, методу и статусу.'
+    ),
+    'foodgram_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'
+    ),
+    'foodgram_db_queries_total': ('counter', 'SQL-запросы по маршрутам.'),
+    'foodgram_db_query_duration_seconds_total': (
+        'counter', 'Суммарное время SQL-запросов по маршрутам.'
+    ),
+    'foodgram_serializer_duration_seconds': (
+        'histogram', 'Время сериализации одного объекта или страницы.'
+    ),
+    'foodgram_cache_requests_total': (
+        'counter', 'Обращения к кешам: hit или miss.'
+    ),
+    'foodgram_image_processing_seconds': (
+        'histogram', 'Декодирование и сохранение изображений.'
+    ),
+    'foodgram_db_pool_events_total': (
+        'counter', 'События пула соединений с БД.'
+    ),
+    'foodgram_db_pool_connections': (
+        'gauge', 'Соединения пула с БД по состоянию.'
+    ),
+}
+POOL_COUNTERS = ('checkouts', 'connects', 'recycles', 'discards', 'timeouts')
+POOL_GAUGES = ('size', 'idle', 'in_use', 'max_size')
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_token = uuid.uuid4().hex
+_last_flush = time.monotonic()
+_flush_lock = threading.Lock()
+_request_queries = ContextVar('request_queries', default=None)
+
+
+def inc(name, value=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    index = bisect_left(buckets, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [
+                buckets, [0] * (len(buckets) + 1), 0.0
+            ]
+        histogram[1][index] += 1
+        histogram[2] += value
+
+
+@contextmanager
+def timer(name, buckets, **labels):
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, perf_counter() - started, buckets, **labels)
+
+
+def cache_lookup(cache, hit):
+    inc(
+        'foodgram_cache_requests_total',
+        cache=cache, result='hit' if hit else 'miss',
+    )
+
+
+def image_timer(source, stage):
+    return timer('foodgram_image_processing_seconds', IMAGE_BUCKETS,
+                 source=source, stage=stage)
+
+
+@contextmanager
+def serializer_timer(serializer):
+    with measure('serialize'), timer(
+        'foodgram_serializer_duration_seconds', SERIALIZER_BUCKETS,
+        serializer=serializer,
+    ):
+        yield
+
+
+class TimedRepresentationMixin:
+    """Время to_representation сериализатора (на каждый объект)."""
+
+    def to_representation(self, instance):
+        with serializer_timer(type(self).__name__):
+            return super().to_representation(instance)
+
+
+def _record_query(execute, sql, params, many, context):
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        # list.append атомарен: запросы из потоков gather не теряются.
+        queries.append(perf_counter() - started)
+
+
+def current_queries():
+    """Длительности SQL-запросов текущего запроса."""
+    return _request_queries.get() or []
+
+
+def _install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_query_recorder)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Латентность, статусы и SQL-запросы по маршрутам."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Соединения, открытые до загрузки middleware (manage.py shell).
+        for connection in connections.all(initialized_only=True):
+            _install_query_recorder(None, connection)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started, queries = perf_counter(), []
+        token = _request_queries.set(queries)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        _record_request(request, response, started, queries)
+        return response
+
+    async def __acall__(self, request):
+        started, queries = perf_counter(), []
+        token = _request_queries.set(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        _record_request(request, response, started, queries)
+        return response
+
+
+def _record_request(request, response, started, queries):
+    elapsed = perf_counter() - started
+    route = _route(request)
+    inc('foodgram_http_requests_total', route=route, method=request.method,
+        status=str(response.status_code))
+    observe('foodgram_http_request_duration_seconds', elapsed,
+            LATENCY_BUCKETS, route=route, method=request.method)
+    if queries:
+        inc('foodgram_db_queries_total', len(queries), route=route)
+        inc('foodgram_db_query_duration_seconds_total', sum(queries),
+            route=route)
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+
+def _snapshot():
+    with _lock:
+        counters = [
+            [name, labels, value]
+            for (name, labels), value in _counters.items()
+        ]
+        histograms = [
+            [name, labels, buckets, list(counts), total]
+            for (name, labels), (buckets, counts, total)
+            in _histograms.items()
+        ]
+    gauges = []
+    for alias, stats in pool_stats().items():
+        for event in POOL_COUNTERS:
+            counters.append([
+                'foodgram_db_pool_events_total',
+                [['alias', alias], ['event', event]], stats[event],
+            ])
+        for state in POOL_GAUGES:
+            gauges.append([
+                'foodgram_db_pool_connections',
+                [['alias', alias], ['state', state]], stats[state],
+            ])
+    return {
+        'token': _token,
+        'counters': counters,
+        'histograms': histograms,
+        'gauges': gauges,
+    }
+
+
+def _path(name):
+    return os.path.join(settings.METRICS_DIR, name)
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as snapshot:
+            return orjson.loads(snapshot.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+def _write(path, snapshot):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as target:
+        target.write(orjson.dumps(snapshot))
+    os.replace(tmp, path)
+
+
+def _merge(total, snapshot):
+    """Складывает снимок в total, gauge не переносятся."""
+    counters = total.setdefault('counters', {})
+    for name, labels, value in snapshot['counters']:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    histograms = total.setdefault('histograms', {})
+    for name, labels, buckets, counts, value in snapshot['histograms']:
+        key = (name, tuple(map(tuple, labels)))
+        if key in histograms:
+            merged = histograms[key]
+            merged[1] = [a + b for a, b in zip(merged[1], counts)]
+            merged[2] += value
+        else:
+            histograms[key] = [buckets, list(counts), value]
+    return total
+
+
+def _as_snapshot(total):
+    return {
+        'counters': [
+            [name, labels, value]
+            for (name, labels), value in total.get('counters', {}).items()
+        ],
+        'histograms': [
+            [name, labels, *histogram]
+            for (name, labels), histogram
+            in total.get('histograms', {}).items()
+        ],
+        'gauges': [],
+    }
+
+
+def _archive(path):
+    """Переносит счётчики снимка завершившегося воркера в archive.json."""
+    archive_path = _path('archive.json')
+    with open(_path('archive.lock'), 'w') as lock:
+        fcntl.lockf(lock, fcntl.LOCK_EX)
+        # Читаем под блокировкой: параллельный scrape мог уже перенести снимок.
+        snapshot = _read(path)
+        if snapshot is not None:
+            archive = _read(archive_path)
+            total = _merge({}, archive) if archive else {}
+            _write(archive_path, _as_snapshot(_merge(total, snapshot)))
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def flush():
+    """Сбрасывает снимок метрик процесса в METRICS_DIR."""
+    global _last_flush
+
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _last_flush = time.monotonic()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = _path(f'{os.getpid()}.json')
+        previous = _read(path)
+        if previous is not None and previous.get('token') != _token:
+            # pid достался от завершившегося процесса.
+            _archive(path)
+        _write(path, _snapshot())
+    except OSError:
+        pass
+    finally:
+        _flush_lock.release()
+
+
+atexit.register(flush)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Сумма снимков всех воркеров: (total, gauges)."""
+    flush()
+    total, gauges = {}, {}
+    for name in os.listdir(settings.METRICS_DIR):
+        pid, _, suffix = name.partition('.')
+        if suffix != 'json' or not pid.isdigit():
+            continue
+        path = _path(name)
+        if not _alive(int(pid)):
+            _archive(path)
+            continue
+        snapshot = _read(path)
+        if snapshot is None:
+            continue
+        _merge(total, snapshot)
+        for metric, labels, value in snapshot['gauges']:
+            key = (metric, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0) + value
+    archive = _read(_path('archive.json'))
+    if archive is not None:
+        _merge(total, archive)
+    return total, gauges
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + body + '}'
+
+
+def render_metrics():
+    total, gauges = collect()
+    series = {}
+    for (name, labels), value in sorted(total.get('counters', {}).items()):
+        series.setdefault(name, []).append(
+            f'{name}{_format_labels(labels)} {value}'
+        )
+    for (name, labels), (buckets, counts, value) in sorted(
+        total.get('histograms', {}).items()
+    ):
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip([*buckets, '+Inf'], counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{_format_labels(labels, [("le", bound)])} '
+                f'{cumulative}'
+            )
+        lines.append(f'{name}_sum{_format_labels(labels)} {value}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    for (name, labels), value in sorted(gauges.items()):
+        series.setdefault(name, []).append(
+            f'{name}{_format_labels(labels)} {value}'
+        )
+    output = []
+    for name, (kind, help_text) in METRICS.items():
+        if name not in series:
+            continue
+        output.append(f'# HELP {name} {help_text}')
+        output.append(f'# TYPE {name} {kind}')
+        output.extend(series[name])
+    return '\n'.join(output) + '\n'
+
+
+def metrics_view(request):
+    """
+    Эндпоинт для Prometheus. Не проксируется nginx; если задан
+    METRICS_TOKEN, требуется заголовок Authorization: Bearer <token>.
+    """
+    if settings.METRICS_TOKEN and request.headers.get('Authorization') != (
+        f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_metrics(), content_type='text/plain; version=0.0.4'
+    )
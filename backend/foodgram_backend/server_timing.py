@@ -0,0 +1,135 @@
+"""
+Заголовок Server-Timing с разбивкой времени запроса.
+
+Фазы: auth (TokenAuthentication), perm (проверка прав), throttle,
+filter (filter_queryset), db (все SQL-запросы запроса, по данным
+метрик), serialize (сериализаторы с TimedRepresentationMixin и
+сборка быстрых списков; включает их SQL-запросы), render и total.
+Заголовок добавляется ко всем ответам при SERVER_TIMING=True либо
+к ответам staff-пользователям, приславшим заголовок X-Server-Timing.
+Без этого замеры не ведутся: каждая точка замера стоит одного
+чтения ContextVar.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REQUEST_HEADER = 'X-Server-Timing'
+
+_timings = ContextVar('server_timings', default=None)
+
+
+class Timings(dict):
+    """Суммарные длительности фаз в секундах."""
+
+    def __init__(self):
+        super().__init__()
+        self.active = set()
+
+
+@contextmanager
+def measure(name):
+    """
+    Замер фазы name. Вложенные замеры той же фазы (сериализатор
+    внутри сериализатора) не учитываются повторно.
+    """
+    timings = _timings.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(name)
+        timings[name] = timings.get(name, 0) + perf_counter() - started
+
+
+def header_value(timings, queries, total):
+    entries = [
+        f'{name};dur={duration * 1000:.2f}'
+        for name, duration in timings.items()
+    ]
+    if queries:
+        entries.append(
+            f'db;dur={sum(queries) * 1000:.2f};desc="{len(queries)} queries"'
+        )
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class ServerTimingMiddleware:
+    """Включает замеры для запроса и добавляет заголовок к ответу."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._requested(request):
+            return self.get_response(request)
+        started, token = perf_counter(), _timings.set(Timings())
+        try:
+            response = self.get_response(request)
+            return self._finish(request, response, started)
+        finally:
+            _timings.reset(token)
+
+    async def __acall__(self, request):
+        if not self._requested(request):
+            return await self.get_response(request)
+        started, token = perf_counter(), _timings.set(Timings())
+        try:
+            response = await self.get_response(request)
+            return self._finish(request, response, started)
+        finally:
+            _timings.reset(token)
+
+    def _requested(self, request):
+        return settings.SERVER_TIMING or REQUEST_HEADER in request.headers
+
+    def _finish(self, request, response, started):
+        from .metrics import current_queries
+
+        user = getattr(request, 'user', None)
+        if settings.SERVER_TIMING or (user is not None and user.is_staff):
+            response['Server-Timing'] = header_value(
+                _timings.get(), current_queries(),
+                perf_counter() - started,
+            )
+        return response
+
+
+class ServerTimingMixin:
+    """Замеры фаз APIView.initial и фильтрации для Server-Timing."""
+
+    def perform_authentication(self, request):
+        with measure('auth'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with measure('perm'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with measure('perm'):
+            super().check_object_permissions(request, obj)
+
+    def check_throttles(self, request):
+        with measure('throttle'):
+            super().check_throttles(request)
+
+    def filter_queryset(self, queryset):
+        with measure('filter'):
+            return super().filter_queryset(queryset)
@@ -42,16 +42,54 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'recipes.pagination.RecipePagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    # Адрес клиента для лимитов anon — последний адрес из
+    # X-Forwarded-For, добавленный gateway (nginx); за ещё одним
+    # прокси на хосте задайте NUM_PROXIES=2.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '30/s',
+        'user': '60/s',
+        'ingredients': '20/s',
+        'shopping_cart_download': '10/min',
+        'recipe_import': '10/min',
+    },
 }
 
+# Хранилище корзин throttling: shm — общий для воркеров файл в памяти,
+# redis — для нескольких хостов (THROTTLE_REDIS_URL или REDIS_URL).
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', 'shm')
+THROTTLE_STORE_PATH = os.getenv(
+    'THROTTLE_STORE_PATH',
+    '/dev/shm/foodgram-throttle' if os.path.isdir('/dev/shm')
+    else '/tmp/foodgram-throttle',
+)
+THROTTLE_STORE_SLOTS = int(os.getenv('THROTTLE_STORE_SLOTS', 65536))
+THROTTLE_REDIS_URL = os.getenv('THROTTLE_REDIS_URL', os.getenv('REDIS_URL'))
+
 MIDDLEWARE = [
+    'foodgram_backend.metrics.MetricsMiddleware',
+    'foodgram_backend.server_timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilerMiddleware',
+    'foodgram_backend.db.router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,22 +113,127 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
+ASGI_APPLICATION = 'foodgram_backend.asgi.application'
+
+# Режим запуска: wsgi (синхронные воркеры gunicorn) или asgi
+# (воркеры uvicorn). В режиме asgi read-эндпоинты обслуживаются
+# асинхронными view, см. api/async_views.py и gunicorn.conf.py.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+ASYNC_API = SERVER_MODE == 'asgi'
+
+# Отложенные задачи (api/jobs.py) выполняет воркер manage.py run_jobs.
+# JOBS_EAGER=true — выполнять их сразу после фиксации транзакции в
+# процессе запроса, без воркера (разработка).
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False').lower() in ('true', '1', 'yes')
 
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_POOL включает пул соединений внутри процесса
+# (foodgram_backend/db/pool.py), иначе воркер держит постоянное
+# соединение с проверкой перед использованием. Под ASGI каждый запрос
+# выполняется в новом потоке, поэтому без пула соединения не держим.
+# DB_TRANSACTION_POOLER — база доступна через pgbouncer в режиме
+# transaction: серверные курсоры между транзакциями не переживают.
+DB_POOL = os.getenv('DB_POOL', 'False').lower() in ('true', '1', 'yes')
+DB_TRANSACTION_POOLER = os.getenv(
+    'DB_TRANSACTION_POOLER', 'False').lower() in ('true', '1', 'yes')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'foodgram_backend.db.postgresql' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'foodgram'),
         'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(
+            os.getenv('DB_CONN_MAX_AGE', 0 if ASYNC_API else 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': DB_TRANSACTION_POOLER,
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+            'MAX_LIFETIME': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+            'MAX_IDLE': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+            'HEALTH_CHECK_INTERVAL': float(
+                os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+        },
     }
 }
 
+# Реплики для чтения: DB_REPLICA_HOSTS=host1,host2:5433. Для локальной
+# проверки можно указать тот же хост, что и у основной базы.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['foodgram_backend.db.router.PrimaryReplicaRouter']
+READ_REPLICA_VIEWS = [
+    'recipes.views.RecipeViewSet',
+    'recipes.views.TagViewSet',
+    'recipes.views.IngredientViewSet',
+    'api.views.UserViewSet',
+]
+REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+
+# Server-Timing во всех ответах; иначе только для staff по X-Server-Timing.
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'False').lower() in (
+    'true', '1', 'yes')
+
+# Журнал медленных запросов (manage.py slow_queries).
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_SAMPLE_RATE', 1))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'True').lower() in (
+    'true', '1', 'yes')
+SLOW_QUERY_EXPLAIN_INTERVAL = int(
+    os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+SLOW_QUERY_DIR = os.getenv('SLOW_QUERY_DIR', '/tmp/foodgram-slow-queries')
+SLOW_QUERY_MAX_BYTES = int(os.getenv('SLOW_QUERY_MAX_BYTES', 10 * 2 ** 20))
+SLOW_QUERY_BACKUPS = int(os.getenv('SLOW_QUERY_BACKUPS', 5))
+
+# Профили запросов staff-пользователей (X-Profile / ?_profile=).
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/foodgram-profiles')
+
+# Снимки метрик воркеров для /metrics; каталог общий для воркеров.
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    '/dev/shm/foodgram-metrics' if os.path.isdir('/dev/shm')
+    else '/tmp/foodgram-metrics',
+)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Кеш, общий для всех воркеров: Redis, если задан REDIS_URL,
+# иначе файловый кеш на локальном диске.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', '/tmp/foodgram_cache'),
+            'OPTIONS': {'MAX_ENTRIES': 10_000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -1,7 +1,16 @@
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from foodgram_backend.metrics import metrics_view
+from recipes.views import short_link_redirect
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    re_path(
+        r'^s/(?P<code>[0-9a-zA-Z]+)/?$',
+        short_link_redirect,
+        name='short-link',
+    ),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from foodgram_backend import cleanup, fuzzy_search
+
+        from . import signals, tasks  # noqa: F401
+        from .models import Ingredient, Recipe
+
+        fuzzy_search.register(Ingredient, 'name')
+        cleanup.register(Recipe, 'image')
@@ -0,0 +1,84 @@
+"""Асинхронные read-эндпоинты рецептов, тегов и ингредиентов (ASGI)."""
+from asgiref.sync import sync_to_async
+from rest_framework import exceptions
+
+from api.async_views import gather, not_found, paginate
+from api.constants import INGREDIENT_SEARCH_LIMIT
+from foodgram_backend import fuzzy_search
+
+from . import reference_data
+from .fast_serializers import (INGREDIENT_FIELDS, RECIPE_OUTPUT_FIELDS,
+                               TAG_FIELDS, build_recipes, recipe_batches,
+                               recipe_columns, requested_fields)
+from .filters import RecipeFilter
+from .models import Ingredient, Recipe, Tag
+from .pagination import RecipePagination
+
+
+async def _represent_recipes(request, rows, fields=RECIPE_OUTPUT_FIELDS):
+    """Как represent_recipes, но пакеты запросов выполняются параллельно."""
+    if not rows:
+        return []
+    batches = recipe_batches(request.user, rows, fields)
+    results = await gather(*batches.values())
+    return build_recipes(request, rows, dict(zip(batches, results)), fields)
+
+
+async def recipes_list(request):
+    params = request.query_params
+    fields = requested_fields(params)
+    # Та же логика, что в RecipeViewSet.list.
+    if not ({'is_in_shopping_cart', 'is_favorited', 'author'} & set(params)
+            or params.getlist('tags')):
+        return {'count': 0, 'next': None, 'previous': None, 'results': []}
+    filterset = RecipeFilter(
+        data=params, queryset=Recipe.objects.all(), request=request
+    )
+    if not filterset.is_valid():
+        raise exceptions.ValidationError(filterset.errors)
+    pagination = await paginate(
+        request, RecipePagination, filterset.qs,
+        lambda page: list(page.values(*recipe_columns(fields))),
+    )
+    return pagination.get_paginated_response(
+        await _represent_recipes(request, pagination.page.object_list, fields)
+    ).data
+
+
+async def recipe_detail(request, pk):
+    try:
+        row = await Recipe.objects.values(*recipe_columns()).aget(pk=pk)
+    except Recipe.DoesNotExist:
+        raise not_found(Recipe)
+    return (await _represent_recipes(request, [row]))[0]
+
+
+async def tags_list(request):
+    return await sync_to_async(reference_data.blob_response)(request, 'tags')
+
+
+async def tag_detail(request, id):
+    try:
+        return await Tag.objects.values(*TAG_FIELDS).aget(id=id)
+    except Tag.DoesNotExist:
+        raise not_found(Tag)
+
+
+async def ingredients_list(request):
+    search = request.query_params.get('name', '')
+    if not search:
+        return await sync_to_async(reference_data.blob_response)(
+            request, 'ingredients'
+        )
+    queryset = await sync_to_async(fuzzy_search.search)(
+        Ingredient.objects.all(), 'name', search, INGREDIENT_SEARCH_LIMIT
+    )
+    queryset = queryset.values(*INGREDIENT_FIELDS)
+    return [ingredient async for ingredient in queryset]
+
+
+async def ingredient_detail(request, pk):
+    try:
+        return await Ingredient.objects.values(*INGREDIENT_FIELDS).aget(pk=pk)
+    except Ingredient.DoesNotExist:
+        raise not_found(Ingredient)
@@ -0,0 +1,399 @@
+"""
+Пакетный импорт рецептов из NDJSON или CSV.
+
+Строка NDJSON — объект с полями name, text, cooking_time, tags
+(id или slug), ingredients ([{"id" или "name", "amount"}]) и image
+(имя файла из каталога или архива изображений либо data:-URI).
+В CSV теги перечисляются через запятую, ингредиенты — через точку
+с запятой в виде «id или название:количество».
+
+Теги и ингредиенты сопоставляются по словарям, загруженным один раз
+на импорт. Проверенные строки сохраняются пакетами по
+IMPORT_BATCH_SIZE: рецепты, ингредиенты и теги — bulk_create в одной
+транзакции, индексы похожих рецептов и поиска по продуктам — одним
+обновлением на пакет. Ошибки копятся по номерам строк и не
+прерывают импорт; если пакет не записался целиком, его строки
+сохраняются по одной.
+"""
+import base64
+import binascii
+import codecs
+import csv
+import io
+import os
+import uuid
+import zipfile
+import zlib
+from collections import namedtuple
+
+import orjson
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, transaction
+from PIL import Image
+
+from api.constants import (IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS,
+                           IMPORT_MAX_IMAGE_SIZE, MAX_COOKING_TIME,
+                           MAX_INGREDIENT_AMOUNT, MAX_LENGTH_NAME,
+                           MIN_COOKING_TIME, MIN_INGREDIENT_AMOUNT)
+from api import jobs
+from foodgram_backend.metrics import image_timer
+
+from . import pantry, similar
+from .models import Ingredient, Recipe, RecipeIngredient, Tag
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+REQUIRED = 'Обязательное поле.'
+
+Item = namedtuple('Item', 'line recipe ingredients tag_ids')
+
+
+class RowError(Exception):
+    """Ошибки строки в формате ошибок DRF: {поле: [сообщения]}."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class ImageDirectory:
+    """Изображения из каталога; имена вне каталога не читаются."""
+
+    def __init__(self, path):
+        self.root = os.path.realpath(path)
+
+    def read(self, name):
+        path = os.path.realpath(os.path.join(self.root, name))
+        if (
+            os.path.commonpath([self.root, path]) != self.root
+            or not os.path.isfile(path)
+        ):
+            return None
+        if os.path.getsize(path) > IMPORT_MAX_IMAGE_SIZE:
+            raise RowError({'image': ['Файл изображения слишком большой.']})
+        with open(path, 'rb') as file:
+            return file.read()
+
+
+class ImageArchive:
+    """Изображения из ZIP-архива."""
+
+    def __init__(self, file):
+        self.archive = zipfile.ZipFile(file)
+
+    def read(self, name):
+        try:
+            info = self.archive.getinfo(name)
+        except KeyError:
+            return None
+        if info.file_size > IMPORT_MAX_IMAGE_SIZE:
+            raise RowError({'image': ['Файл изображения слишком большой.']})
+        try:
+            return self.archive.read(info)
+        except (zipfile.BadZipFile, zlib.error, EOFError,
+                NotImplementedError, RuntimeError):
+            # Повреждённая запись, неподдерживаемое сжатие или пароль.
+            raise RowError({'image': [f'Файл {name} в архиве повреждён.']})
+
+
+def detect_format(filename, requested=None):
+    if requested in FORMATS:
+        return requested
+    return CSV if filename.lower().endswith('.csv') else NDJSON
+
+
+def _ndjson_rows(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError as error:
+            yield number, RowError({'non_field_errors': [str(error)]})
+            continue
+        if not isinstance(row, dict):
+            row = RowError({'non_field_errors': ['Ожидается объект.']})
+        yield number, row
+
+
+def _csv_ingredient(item):
+    key, _, amount = item.rpartition(':')
+    key = key.strip()
+    if key.isdecimal():
+        return {'id': int(key), 'amount': amount.strip()}
+    return {'name': key, 'amount': amount.strip()}
+
+
+def _csv_rows(lines):
+    reader = csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+    try:
+        for row in reader:
+            row['tags'] = [
+                int(tag) if tag.isdecimal() else tag
+                for tag in (
+                    tag.strip() for tag in (row.get('tags') or '').split(',')
+                )
+                if tag
+            ]
+            row['ingredients'] = [
+                _csv_ingredient(item)
+                for item in (row.get('ingredients') or '').split(';')
+                if item.strip()
+            ]
+            yield reader.line_num, row
+    except (csv.Error, UnicodeError) as error:
+        yield reader.line_num, RowError({'non_field_errors': [str(error)]})
+
+
+def read_rows(lines, file_format):
+    """(номер строки, словарь или RowError) из строк файла (bytes)."""
+    if file_format == CSV:
+        return _csv_rows(lines)
+    return _ndjson_rows(lines)
+
+
+def _is_key(value):
+    """id (целое) или slug: то, что можно искать в словарях импорта."""
+    return isinstance(value, (int, str)) and not isinstance(value, bool)
+
+
+def _integer(value, low, high):
+    if isinstance(value, str) and value.strip().isdecimal():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError('Введите правильное число.')
+    if not low <= value <= high:
+        raise ValueError(f'Допустимы значения от {low} до {high}.')
+    return value
+
+
+class Importer:
+    """Импорт рецептов одного автора; итог — в data()."""
+
+    def __init__(self, author, images=None):
+        self.author = author
+        self.images = images
+        self.created = []
+        self.failed = 0
+        self.errors = []
+        self.tag_ids = set()
+        self.tag_slugs = {}
+        for tag_id, slug in Tag.objects.values_list('id', 'slug'):
+            self.tag_ids.add(tag_id)
+            self.tag_slugs[slug] = tag_id
+        self.ingredient_ids = set()
+        self.ingredient_names = {}
+        for ingredient_id, name, unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        ):
+            self.ingredient_ids.add(ingredient_id)
+            self.ingredient_names.setdefault(name.lower(), {})[
+                unit.lower()
+            ] = ingredient_id
+
+    def error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'row': line, 'errors': errors})
+
+    def data(self):
+        return {
+            'created': len(self.created),
+            'failed': self.failed,
+            'ids': self.created,
+            'errors': self.errors,
+        }
+
+    def _tags(self, tags):
+        if not isinstance(tags, list) or not tags:
+            raise ValueError(REQUIRED)
+        tag_ids = []
+        for tag in tags:
+            tag_id = None
+            if _is_key(tag):
+                tag_id = (
+                    tag if tag in self.tag_ids else self.tag_slugs.get(tag)
+                )
+            if tag_id is None:
+                raise ValueError(f'Тег {tag} не найден.')
+            if tag_id not in tag_ids:
+                tag_ids.append(tag_id)
+        return tag_ids
+
+    def _ingredient_id(self, item):
+        if 'id' in item:
+            if (
+                not _is_key(item['id'])
+                or item['id'] not in self.ingredient_ids
+            ):
+                raise ValueError(f'Ингредиент {item["id"]} не найден.')
+            return item['id']
+        name = str(item.get('name', ''))
+        units = self.ingredient_names.get(name.lower().strip())
+        if not units:
+            raise ValueError(f'Ингредиент «{name}» не найден.')
+        unit = item.get('measurement_unit')
+        if unit is not None:
+            if str(unit).lower() not in units:
+                raise ValueError(f'Ингредиент «{name} ({unit})» не найден.')
+            return units[str(unit).lower()]
+        if len(units) > 1:
+            raise ValueError(
+                f'Ингредиентов «{name}» несколько, укажите id '
+                'или measurement_unit.'
+            )
+        return next(iter(units.values()))
+
+    def _ingredients(self, items):
+        if not isinstance(items, list) or not items:
+            raise ValueError('Список ингредиентов не может быть пустым')
+        ingredients = {}
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError('Ожидается объект с id и amount.')
+            ingredient_id = self._ingredient_id(item)
+            if ingredient_id in ingredients:
+                raise ValueError('Ингредиенты не должны дублироваться')
+            ingredients[ingredient_id] = _integer(
+                item.get('amount'), MIN_INGREDIENT_AMOUNT,
+                MAX_INGREDIENT_AMOUNT,
+            )
+        return list(ingredients.items())
+
+    def _image(self, value):
+        if not isinstance(value, str) or not value:
+            raise ValueError(REQUIRED)
+        if value.startswith('data:image'):
+            header, _, encoded = value.partition(';base64,')
+            try:
+                with image_timer('recipe', 'decode'):
+                    data = base64.b64decode(encoded, validate=True)
+            except (binascii.Error, ValueError):
+                raise ValueError('Некорректный base64.')
+        else:
+            data = self.images.read(value) if self.images else None
+            if data is None:
+                raise ValueError(f'Файл {value} не найден.')
+        try:
+            with image_timer('recipe', 'validate'):
+                image = Image.open(io.BytesIO(data))
+                image.verify()
+        except Exception:
+            raise ValueError(
+                'Загрузите правильное изображение. Файл, который вы '
+                'загрузили, поврежден или не является изображением.'
+            )
+        extension = (image.format or 'jpeg').lower()
+        return ContentFile(data, name=f'{uuid.uuid4()}.{extension}')
+
+    def clean(self, line, row):
+        """Item из строки или RowError со всеми ошибками полей."""
+        errors = {}
+        values = {}
+
+        def check(field, validate, value):
+            try:
+                values[field] = validate(value)
+            except ValueError as error:
+                errors[field] = [str(error)]
+
+        name = row.get('name')
+        if not isinstance(name, str) or not name.strip():
+            errors['name'] = [REQUIRED]
+        elif len(name) > MAX_LENGTH_NAME:
+            errors['name'] = [
+                f'Убедитесь, что это значение содержит не более '
+                f'{MAX_LENGTH_NAME} символов.'
+            ]
+        text = row.get('text')
+        if not isinstance(text, str) or not text.strip():
+            errors['text'] = [REQUIRED]
+        check(
+            'cooking_time',
+            lambda value: _integer(value, MIN_COOKING_TIME, MAX_COOKING_TIME),
+            row.get('cooking_time'),
+        )
+        check('tags', self._tags, row.get('tags'))
+        check('ingredients', self._ingredients, row.get('ingredients'))
+        if not errors:
+            try:
+                check('image', self._image, row.get('image'))
+            except RowError as error:
+                errors.update(error.errors)
+        if errors:
+            raise RowError(errors)
+        return Item(
+            line=line,
+            recipe=Recipe(
+                author=self.author, name=name, text=text,
+                cooking_time=values['cooking_time'], image=values['image'],
+            ),
+            ingredients=values['ingredients'],
+            tag_ids=values['tags'],
+        )
+
+    def _create(self, items):
+        recipes = Recipe.objects.bulk_create([item.recipe for item in items])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=item.recipe.pk, ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for item in items
+            for ingredient_id, amount in item.ingredients
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=item.recipe.pk, tag_id=tag_id)
+            for item in items
+            for tag_id in item.tag_ids
+        )
+        similar.index_recipes({
+            item.recipe.pk: [
+                ingredient_id for ingredient_id, _ in item.ingredients
+            ]
+            for item in items
+        })
+        pantry.add_recipes({
+            item.recipe.pk: pantry.keys_for(
+                [ingredient_id for ingredient_id, _ in item.ingredients],
+                item.tag_ids,
+            )
+            for item in items
+        })
+        for recipe in recipes:
+            jobs.enqueue('recipes.fan_out', recipe.pk)
+
+    def save(self, items):
+        try:
+            with transaction.atomic():
+                self._create(items)
+        except DatabaseError:
+            # Файлы изображений уже сохранены и при повторе не пишутся.
+            for item in items:
+                item.recipe.pk = None
+                try:
+                    with transaction.atomic():
+                        self._create([item])
+                except DatabaseError as error:
+                    self.error(item.line, {'non_field_errors': [str(error)]})
+                else:
+                    self.created.append(item.recipe.pk)
+        else:
+            self.created.extend(item.recipe.pk for item in items)
+
+    def run(self, rows):
+        batch = []
+        for line, row in rows:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                batch.append(self.clean(line, row))
+            except RowError as error:
+                self.error(line, error.errors)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                self.save(batch)
+                batch = []
+        if batch:
+            self.save(batch)
+        return self.data()
@@ -0,0 +1,184 @@
+"""
+Быстрые read-представления рецептов.
+
+Собирают те же словари, что RecipeReadSerializer и
+RecipeMinifiedSerializer, из строк ``.values()`` и пакетов связанных
+данных (по одному запросу на связь вместо запросов на каждую запись).
+Запись и валидация остаются за DRF-сериализаторами.
+"""
+from operator import itemgetter
+
+from rest_framework.exceptions import ValidationError
+
+from api.fast_serializers import (USER_FIELDS, file_url_builder,
+                                  user_representation)
+from api.models import Subscription, User
+from foodgram_backend.metrics import serializer_timer
+
+from .models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+
+MINIFIED_FIELDS = ('id', 'name', 'image', 'cooking_time')
+TAG_FIELDS = ('id', 'name', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+# Поля ответа в порядке RecipeReadSerializer.
+RECIPE_OUTPUT_FIELDS = (
+    'id', 'tags', 'author', 'ingredients', 'is_favorited',
+    'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
+)
+RECIPE_COLUMNS = ('name', 'image', 'text', 'cooking_time')
+
+
+def _split(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(params):
+    """
+    Поля рецепта из параметров ``fields`` и ``omit`` (через запятую)
+    в порядке RecipeReadSerializer. Без параметров — все поля.
+    """
+    fields = _split(params.get('fields', '')) or set(RECIPE_OUTPUT_FIELDS)
+    omit = _split(params.get('omit', ''))
+    unknown = (fields | omit) - set(RECIPE_OUTPUT_FIELDS)
+    if unknown:
+        raise ValidationError({
+            'fields': [f'Неизвестные поля: {", ".join(sorted(unknown))}.']
+        })
+    return tuple(
+        name for name in RECIPE_OUTPUT_FIELDS
+        if name in fields and name not in omit
+    )
+
+
+def recipe_columns(fields=RECIPE_OUTPUT_FIELDS):
+    """Колонки Recipe для .values(), нужные для полей ответа."""
+    columns = ['id']
+    if 'author' in fields:
+        columns.append('author_id')
+    columns.extend(name for name in RECIPE_COLUMNS if name in fields)
+    return columns
+
+
+def recipe_batches(user, rows, fields=RECIPE_OUTPUT_FIELDS):
+    """
+    Независимые запросы связанных данных для страницы рецептов —
+    аналог prefetch; async-view выполняют их параллельно. Возвращает
+    словарь {имя: функция} только для запрошенных полей.
+    """
+    recipe_ids = [row['id'] for row in rows]
+    author_ids = list({row['author_id'] for row in rows}) if (
+        'author' in fields
+    ) else []
+    authenticated = user.is_authenticated
+    batches = {}
+    if 'tags' in fields:
+        batches['tags'] = lambda: list(
+            Recipe.tags.through.objects
+            .filter(recipe_id__in=recipe_ids)
+            .order_by('tag__name')
+            .values_list('recipe_id', 'tag__id', 'tag__name', 'tag__slug')
+        )
+    if 'ingredients' in fields:
+        batches['ingredients'] = lambda: list(
+            RecipeIngredient.objects
+            .filter(recipe_id__in=recipe_ids)
+            .order_by('id')
+            .values_list(
+                'recipe_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount'
+            )
+        )
+    if 'author' in fields:
+        batches['authors'] = lambda: list(
+            User.objects.filter(id__in=author_ids).values(*USER_FIELDS)
+        )
+    if not authenticated:
+        return batches
+    if 'is_favorited' in fields:
+        batches['favorited'] = lambda: set(
+            Favorite.objects
+            .filter(user=user, recipe_id__in=recipe_ids)
+            .values_list('recipe_id', flat=True)
+        )
+    if 'is_in_shopping_cart' in fields:
+        batches['in_cart'] = lambda: set(
+            ShoppingCart.objects
+            .filter(user=user, recipe_id__in=recipe_ids)
+            .values_list('recipe_id', flat=True)
+        )
+    if 'author' in fields:
+        batches['subscribed'] = lambda: set(
+            Subscription.objects
+            .filter(user=user, author_id__in=author_ids)
+            .values_list('author_id', flat=True)
+        )
+    return batches
+
+
+@serializer_timer('build_recipes')
+def build_recipes(request, rows, batches, fields=RECIPE_OUTPUT_FIELDS):
+    """
+    Словари в формате RecipeReadSerializer (только поля fields)
+    из результатов recipe_batches: {имя: результат}.
+    """
+    recipe_tags = {}
+    for recipe_id, tag_id, name, slug in batches.get('tags', ()):
+        recipe_tags.setdefault(recipe_id, []).append(
+            {'id': tag_id, 'name': name, 'slug': slug}
+        )
+    recipe_ingredients = {}
+    for recipe_id, name, measurement_unit, amount in batches.get(
+        'ingredients', ()
+    ):
+        recipe_ingredients.setdefault(recipe_id, []).append(
+            {'name': name, 'measurement_unit': measurement_unit,
+             'amount': amount}
+        )
+    subscribed = batches.get('subscribed', set())
+    authors = {
+        author['id']: user_representation(request, author, subscribed)
+        for author in batches.get('authors', ())
+    }
+    favorited = batches.get('favorited', set())
+    in_cart = batches.get('in_cart', set())
+    file_url = file_url_builder(request)
+    getters = {
+        'id': itemgetter('id'),
+        'tags': lambda row: recipe_tags.get(row['id'], []),
+        'author': lambda row: authors[row['author_id']],
+        'ingredients': lambda row: recipe_ingredients.get(row['id'], []),
+        'is_favorited': lambda row: row['id'] in favorited,
+        'is_in_shopping_cart': lambda row: row['id'] in in_cart,
+        'name': itemgetter('name'),
+        'image': lambda row: file_url(row['image']),
+        'text': itemgetter('text'),
+        'cooking_time': itemgetter('cooking_time'),
+    }
+    getters = [(name, getters[name]) for name in fields]
+    return [{name: get(row) for name, get in getters} for row in rows]
+
+
+def represent_recipes(request, rows, fields=RECIPE_OUTPUT_FIELDS):
+    """Синхронная версия: rows — строки .values(*recipe_columns(fields))."""
+    rows = list(rows)
+    if not rows:
+        return []
+    batches = {
+        name: fetch()
+        for name, fetch in recipe_batches(request.user, rows, fields).items()
+    }
+    return build_recipes(request, rows, batches, fields)
+
+
+def represent_minified(request, rows):
+    """Словари в формате RecipeMinifiedSerializer."""
+    file_url = file_url_builder(request)
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'image': file_url(row['image']),
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,183 @@
+"""
+Лента рецептов от авторов, на которых подписан пользователь.
+
+Для обычных авторов новый рецепт при публикации раскладывается
+по лентам подписчиков (fan-out on write) в таблицу FeedEntry.
+Авторы с очень большим числом подписчиков помечаются ``feed_pull``:
+их рецепты не рассылаются, а подмешиваются при чтении k-way слиянием.
+Лента читается по ключу (pub_date, id), поэтому стоимость чтения
+зависит от размера страницы, а не от числа подписок; чтение ничего
+не пишет, длину лент держат рассылка и периодическая обрезка.
+"""
+import base64
+import binascii
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Count, Q
+
+from api.constants import (FEED_FANOUT_BATCH_SIZE, FEED_FANOUT_MAX_FOLLOWERS,
+                           FEED_TIMELINE_LENGTH, FEED_TRIM_EVERY)
+from api.models import Subscription, User
+
+from .models import FeedEntry, Recipe
+
+
+def encode_cursor(pub_date, recipe_id):
+    raw = f'{pub_date.isoformat()}|{recipe_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Возвращает (pub_date, recipe_id) или None для битого курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        pub_date, recipe_id = raw.split('|', 1)
+        return datetime.fromisoformat(pub_date), int(recipe_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+def _before(position, date_field, id_field):
+    """Условие keyset-пагинации: строго после позиции курсора."""
+    if position is None:
+        return Q()
+    pub_date, recipe_id = position
+    return Q(**{f'{date_field}__lt': pub_date}) | Q(
+        **{date_field: pub_date, f'{id_field}__lt': recipe_id}
+    )
+
+
+def _trim_timeline(user_id):
+    """Обрезает ленту пользователя до FEED_TIMELINE_LENGTH записей."""
+    boundary = (
+        FeedEntry.objects
+        .filter(user_id=user_id)
+        .order_by('-pub_date', '-recipe_id')
+        .values_list('pub_date', 'recipe_id')
+        [FEED_TIMELINE_LENGTH - 1:FEED_TIMELINE_LENGTH]
+    )
+    boundary = list(boundary)
+    if boundary:
+        FeedEntry.objects.filter(
+            _before(boundary[0], 'pub_date', 'recipe_id'), user_id=user_id
+        ).delete()
+
+
+def fan_out_recipe(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    author = recipe.author
+    if author.feed_pull:
+        return
+    followers = Subscription.objects.filter(author=author)
+    if followers.count() > FEED_FANOUT_MAX_FOLLOWERS:
+        # Дальше рассылка обходится дороже, чем слияние при чтении.
+        User.objects.filter(pk=author.pk).update(feed_pull=True)
+        author.feed_pull = True
+        return
+    follower_ids = followers.values_list('user_id', flat=True).iterator(
+        chunk_size=FEED_FANOUT_BATCH_SIZE
+    )
+    while True:
+        batch = list(islice(follower_ids, FEED_FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(
+                    user_id=user_id, recipe=recipe, pub_date=recipe.pub_date
+                )
+                for user_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+        # Обрезка ленты стоит O(FEED_TIMELINE_LENGTH), поэтому при рассылке
+        # каждая лента обрезается примерно раз в FEED_TRIM_EVERY рецептов.
+        for user_id in batch:
+            if (user_id + recipe.pk) % FEED_TRIM_EVERY == 0:
+                _trim_timeline(user_id)
+
+
+def trim_timelines():
+    """
+    Обрезает ленты, выросшие больше FEED_TIMELINE_LENGTH: рассылка
+    обрезает каждую ленту лишь примерно раз в FEED_TRIM_EVERY рецептов.
+    """
+    user_ids = (
+        FeedEntry.objects
+        .values('user_id')
+        .annotate(entries=Count('pk'))
+        .filter(entries__gt=FEED_TIMELINE_LENGTH)
+        .values_list('user_id', flat=True)
+    )
+    for user_id in user_ids.iterator():
+        _trim_timeline(user_id)
+
+
+def follow(user, author):
+    """Заполняет ленту свежими рецептами автора после подписки."""
+    if author.feed_pull:
+        return
+    recipes = (
+        Recipe.objects
+        .filter(author=author)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')
+        [:FEED_TIMELINE_LENGTH]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user=user, recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes
+        ],
+        ignore_conflicts=True,
+    )
+    _trim_timeline(user.pk)
+
+
+def unfollow(user, author):
+    """Убирает рецепты автора из ленты после отписки."""
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def get_feed_page(user, limit, cursor=None):
+    """
+    Возвращает (recipe_ids, next_position) для одной страницы ленты.
+
+    Источники — материализованная лента пользователя и по одному
+    запросу на каждого pull-автора, каждый не длиннее страницы;
+    они уже отсортированы по (pub_date, id) и сливаются через heapq.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    streams = [
+        FeedEntry.objects
+        .filter(_before(position, 'pub_date', 'recipe_id'), user=user)
+        .order_by('-pub_date', '-recipe_id')
+        .values_list('pub_date', 'recipe_id')
+        [:limit + 1]
+    ]
+    pull_authors = User.objects.filter(
+        followering__user=user, feed_pull=True
+    ).values_list('id', flat=True)
+    for author_id in pull_authors:
+        streams.append(
+            Recipe.objects
+            .filter(_before(position, 'pub_date', 'id'), author_id=author_id)
+            .order_by('-pub_date', '-id')
+            .values_list('pub_date', 'id')
+            [:limit + 1]
+        )
+    merged = heapq.merge(*(list(stream) for stream in streams), reverse=True)
+    page, seen = [], set()
+    for entry in merged:
+        if entry[1] in seen:
+            continue
+        seen.add(entry[1])
+        page.append(entry)
+        if len(page) > limit:
+            break
+    if len(page) > limit:
+        page = page[:limit]
+        return [recipe_id for _, recipe_id in page], page[-1]
+    return [recipe_id for _, recipe_id in page], None
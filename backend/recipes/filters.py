@@ -1,8 +1,25 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 from django_filters.rest_framework import (
-    BooleanFilter, CharFilter, NumberFilter)
+    BooleanFilter, CharFilter, ChoiceFilter, NumberFilter)
+
+from foodgram_backend.fuzzy_search import FuzzySearchFilter
 
 from .models import Recipe
+from .ranking import ORDERINGS
+
+
+def with_tags(queryset, slugs):
+    """
+    Рецепты хотя бы с одним из тегов. EXISTS вместо JOIN + DISTINCT:
+    планировщик может идти по индексу pub_date и остановиться на
+    LIMIT, а не собирать и сортировать все рецепты тегов.
+    """
+    return queryset.filter(Exists(
+        Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag__slug__in=slugs
+        )
+    ))
 
 
 class RecipeFilter(filters.FilterSet):
@@ -10,16 +27,23 @@ class RecipeFilter(filters.FilterSet):
     author = NumberFilter(field_name='author__id')
     is_favorited = BooleanFilter(method='filter_favorited')
     is_in_shopping_cart = BooleanFilter(method='filter_shopping_cart')
+    ordering = ChoiceFilter(
+        choices=[(name, name) for name in ORDERINGS],
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+            'ordering',
+        ]
 
     def filter_tags(self, queryset, name, slugs):
         slugs = self.request.query_params.getlist('tags')
         if not slugs:
             return queryset.none()
-        return queryset.filter(tags__slug__in=slugs).distinct()
+        return with_tags(queryset, slugs)
 
     def filter_favorited(self, queryset, name, favorite):
         user = self.request.user
@@ -32,3 +56,12 @@ class RecipeFilter(filters.FilterSet):
         if cart and user.is_authenticated:
             return queryset.filter(in_shopping_carts__user=user)
         return queryset
+
+    def filter_ordering(self, queryset, name, ordering):
+        return queryset.order_by(*ORDERINGS[ordering])
+
+
+class IngredientSearchFilter(FuzzySearchFilter):
+    """Поиск ингредиентов по параметру name вместо search."""
+
+    search_param = 'name'
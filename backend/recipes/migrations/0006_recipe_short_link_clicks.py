@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='short_link_clicks',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='Переходы по короткой ссылке'
+            ),
+        ),
+    ]
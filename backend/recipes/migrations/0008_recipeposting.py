@@ -0,0 +1,47 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_similarity_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipePosting',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[
+                            ('ingredient', 'Ингредиент'),
+                            ('tag', 'Тег'),
+                            ('size', 'Число ингредиентов'),
+                        ],
+                        max_length=10,
+                        verbose_name='Вид ключа',
+                    ),
+                ),
+                ('key', models.PositiveIntegerField(verbose_name='Ключ')),
+                ('chunk', models.PositiveIntegerField(verbose_name='Блок id рецептов')),
+                ('data', models.BinaryField(default=b'', verbose_name='Рецепты')),
+            ],
+            options={
+                'verbose_name': 'Список рецептов индекса',
+                'verbose_name_plural': 'Списки рецептов индекса',
+                'unique_together': {('kind', 'key', 'chunk')},
+            },
+        ),
+    ]
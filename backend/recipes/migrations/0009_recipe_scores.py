@@ -0,0 +1,122 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:39
+
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+from api.constants import (RANK_FAVORITE_WEIGHT, RANK_POPULAR_HALF_LIFE,
+                           RANK_SHOPPING_CART_WEIGHT, RANK_TRENDING_HALF_LIFE)
+
+# Как в recipes.ranking на момент миграции.
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HALF_LIVES = {
+    'trending_score': RANK_TRENDING_HALF_LIFE,
+    'popular_score': RANK_POPULAR_HALF_LIFE,
+}
+WEIGHTS = {
+    'Favorite': RANK_FAVORITE_WEIGHT,
+    'ShoppingCart': RANK_SHOPPING_CART_WEIGHT,
+}
+
+
+def backfill_created_at(apps, schema_editor):
+    """
+    Старые добавления датируются публикацией рецепта: с моментом
+    миграции они все разом оказались бы «в тренде».
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    pub_date = Subquery(
+        Recipe.objects.filter(pk=OuterRef('recipe_id')).values('pub_date')[:1]
+    )
+    for name in WEIGHTS:
+        apps.get_model('recipes', name).objects.update(created_at=pub_date)
+
+
+def compute_scores(apps, schema_editor):
+    """Рейтинги по существующим добавлениям, как ranking.rebuild()."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    scores = defaultdict(dict)
+    for name, weight in WEIGHTS.items():
+        for recipe_id, created_at in (
+            apps.get_model('recipes', name).objects
+            .values_list('recipe_id', 'created_at').iterator()
+        ):
+            recipe_scores = scores[recipe_id]
+            for field, half_life in HALF_LIVES.items():
+                value = math.log(weight) + (
+                    (created_at - EPOCH).total_seconds()
+                    * math.log(2) / half_life
+                )
+                score = recipe_scores.get(field)
+                recipe_scores[field] = value if score is None else (
+                    max(score, value)
+                    + math.log1p(math.exp(-abs(score - value)))
+                )
+    Recipe.objects.bulk_update(
+        [
+            Recipe(pk=recipe_id, **recipe_scores)
+            for recipe_id, recipe_scores in scores.items()
+        ],
+        list(HALF_LIVES),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipeposting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name='Добавлено',
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='popular_score',
+            field=models.FloatField(
+                default=0, editable=False, verbose_name='Рейтинг «популярное»'
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(
+                default=0, editable=False, verbose_name='Рейтинг «в тренде»'
+            ),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name='Добавлено',
+            ),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.RunPython(compute_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-trending_score', '-pub_date'], name='recipe_trending_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-popular_score', '-pub_date'], name='recipe_popular_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_scores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'
+            ),
+        ),
+    ]
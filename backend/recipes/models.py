@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
 from api.constants import (MAX_LENGTH_NAME, MAX_LENGTH_SLUG, MIN_COOKING_TIME,
                            MAX_COOKING_TIME, MIN_INGREDIENT_AMOUNT,
@@ -84,11 +85,42 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True, verbose_name='Дата публикации', db_index=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
+    short_link_clicks = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='Переходы по короткой ссылке',
+    )
+    # Логарифмы затухающих сумм активности (recipes.ranking), 0 — нет.
+    trending_score = models.FloatField(
+        default=0, editable=False, verbose_name='Рейтинг «в тренде»'
+    )
+    popular_score = models.FloatField(
+        default=0, editable=False, verbose_name='Рейтинг «популярное»'
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'], name='recipe_updated_at_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-trending_score', '-pub_date'],
+                name='recipe_trending_idx',
+            ),
+            models.Index(
+                fields=['-popular_score', '-pub_date'],
+                name='recipe_popular_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -131,6 +163,9 @@ class Favorite(models.Model):
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE, related_name='favorited_by'
     )
+    created_at = models.DateTimeField(
+        default=timezone.now, editable=False, verbose_name='Добавлено'
+    )
 
     class Meta:
         unique_together = ('user', 'recipe')
@@ -151,6 +186,9 @@ class ShoppingCart(models.Model):
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE, related_name='in_shopping_carts'
     )
+    created_at = models.DateTimeField(
+        default=timezone.now, editable=False, verbose_name='Добавлено'
+    )
 
     class Meta:
         unique_together = ('user', 'recipe')
@@ -160,3 +198,102 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} {self.recipe}'
+
+
+class FeedEntry(models.Model):
+    """Запись в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        unique_together = ('user', 'recipe')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ['-pub_date', '-recipe']
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.recipe}'
+
+
+class RecipeSignature(models.Model):
+    """MinHash-сигнатура ингредиентов рецепта (recipes.similar)."""
+
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='signature',
+    )
+    minhash = models.BinaryField(verbose_name='MinHash-сигнатура')
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class RecipeSimilarityBand(models.Model):
+    """Корзина LSH, в которую попала полоса сигнатуры рецепта."""
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similarity_bands'
+    )
+    key = models.BigIntegerField(verbose_name='Ключ корзины')
+
+    class Meta:
+        verbose_name = 'Корзина LSH'
+        verbose_name_plural = 'Корзины LSH'
+        indexes = [
+            models.Index(
+                fields=['key', 'recipe'], name='similar_band_key_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.key}'
+
+
+class RecipePosting(models.Model):
+    """
+    Контейнер инвертированного индекса по ингредиентам (recipes.pantry):
+    рецепты с id из одного блока chunk, у которых есть ключ key.
+    """
+
+    INGREDIENT = 'ingredient'
+    TAG = 'tag'
+    SIZE = 'size'
+
+    KIND_CHOICES = [
+        (INGREDIENT, 'Ингредиент'),
+        (TAG, 'Тег'),
+        (SIZE, 'Число ингредиентов'),
+    ]
+
+    kind = models.CharField(
+        max_length=max(len(kind) for kind, _ in KIND_CHOICES),
+        choices=KIND_CHOICES,
+        verbose_name='Вид ключа',
+    )
+    key = models.PositiveIntegerField(verbose_name='Ключ')
+    chunk = models.PositiveIntegerField(verbose_name='Блок id рецептов')
+    data = models.BinaryField(default=b'', verbose_name='Рецепты')
+
+    class Meta:
+        verbose_name = 'Список рецептов индекса'
+        verbose_name_plural = 'Списки рецептов индекса'
+        unique_together = ('kind', 'key', 'chunk')
+
+    def __str__(self):
+        return f'{self.kind}:{self.key}:{self.chunk}'
@@ -0,0 +1,359 @@
+"""
+Поиск «готовлю из того, что есть» по инвертированному индексу.
+
+Вместо GROUP BY/HAVING по RecipeIngredient используются битовые
+списки рецептов (RecipePosting) в духе roaring bitmap: id рецептов
+делятся на блоки по 65536, блок хранится массивом uint16, пока в нём
+меньше 1024 рецептов, и битовой картой в 8 КиБ после (порог ниже,
+чем 4096 в roaring: разбор массива в Python дороже чтения карты).
+Ключи — каждый ингредиент, тег и число ингредиентов рецепта.
+Для запроса читаются только списки выбранных ингредиентов, тегов
+и подходящих размеров; число совпавших ингредиентов каждого рецепта
+считается побитовыми сумматорами над целыми Python (по разряду
+счётчика на int), так что работа идёт над словами, а не над
+строками. Индекс обновляется при сохранении и удалении рецепта,
+ингредиента и тега; перестроить целиком — manage.py
+build_pantry_index.
+"""
+import struct
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Recipe, RecipeIngredient, RecipePosting, Tag
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+BITMAP_BYTES = CHUNK_SIZE // 8
+ARRAY_MAX = 1024
+FULL = (1 << CHUNK_SIZE) - 1
+
+INGREDIENT = RecipePosting.INGREDIENT
+TAG = RecipePosting.TAG
+SIZE = RecipePosting.SIZE
+
+
+def decode(data):
+    """Контейнер -> битовая карта блока (int)."""
+    data = bytes(data)
+    if len(data) == BITMAP_BYTES:
+        return int.from_bytes(data, 'little')
+    bits = bytearray(BITMAP_BYTES)
+    for position in struct.unpack(f'<{len(data) // 2}H', data):
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _pack(positions):
+    """Отсортированные позиции блока -> массив или карта, что короче."""
+    if len(positions) < ARRAY_MAX:
+        return struct.pack(f'<{len(positions)}H', *positions)
+    bits = bytearray(BITMAP_BYTES)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return bytes(bits)
+
+
+def encode(bitmap):
+    data = bitmap.to_bytes(BITMAP_BYTES, 'little')
+    if bin(bitmap).count('1') >= ARRAY_MAX:
+        return data
+    return _pack([
+        index * 8 + bit
+        for index, byte in enumerate(data) if byte
+        for bit in range(8) if byte >> bit & 1
+    ])
+
+
+def keys_for(ingredient_ids, tag_ids):
+    """Ключи индекса рецепта с такими ингредиентами и тегами."""
+    ingredient_ids = set(ingredient_ids)
+    keys = {(INGREDIENT, ingredient_id) for ingredient_id in ingredient_ids}
+    keys.update((TAG, tag_id) for tag_id in tag_ids)
+    if ingredient_ids:
+        keys.add((SIZE, len(ingredient_ids)))
+    return keys
+
+
+def recipe_keys(recipe_id):
+    """Ключи индекса, под которыми рецепт должен числиться сейчас."""
+    return keys_for(
+        RecipeIngredient.objects
+        .filter(recipe_id=recipe_id)
+        .values_list('ingredient_id', flat=True),
+        Recipe.tags.through.objects
+        .filter(recipe_id=recipe_id)
+        .values_list('tag_id', flat=True),
+    )
+
+
+def _apply(recipe_id, added, removed):
+    if not added and not removed:
+        return
+    chunk, position = divmod(recipe_id, CHUNK_SIZE)
+    condition = Q()
+    for kind, key in added | removed:
+        condition |= Q(kind=kind, key=key)
+    with transaction.atomic():
+        RecipePosting.objects.bulk_create(
+            [
+                RecipePosting(kind=kind, key=key, chunk=chunk)
+                for kind, key in sorted(added)
+            ],
+            ignore_conflicts=True,
+        )
+        postings = list(
+            RecipePosting.objects
+            .select_for_update()
+            .filter(condition, chunk=chunk)
+            .order_by('pk')
+        )
+        for posting in postings:
+            bitmap = decode(posting.data)
+            if (posting.kind, posting.key) in added:
+                bitmap |= 1 << position
+            else:
+                bitmap &= ~(1 << position)
+            posting.data = encode(bitmap)
+        RecipePosting.objects.bulk_update(postings, ['data'])
+
+
+def add_recipes(recipes):
+    """
+    Добавляет в индекс пачку новых рецептов {id: ключи}: по одному
+    запросу на блок вместо запросов на каждый рецепт.
+    """
+    chunks = defaultdict(lambda: defaultdict(list))
+    for recipe_id, keys in recipes.items():
+        chunk, position = divmod(recipe_id, CHUNK_SIZE)
+        for key in keys:
+            chunks[chunk][key].append(position)
+    with transaction.atomic():
+        for chunk, positions in sorted(chunks.items()):
+            RecipePosting.objects.bulk_create(
+                [
+                    RecipePosting(kind=kind, key=key, chunk=chunk)
+                    for kind, key in sorted(positions)
+                ],
+                ignore_conflicts=True,
+            )
+            keys_by_kind = defaultdict(list)
+            for kind, key in positions:
+                keys_by_kind[kind].append(key)
+            condition = Q()
+            for kind, keys in keys_by_kind.items():
+                condition |= Q(kind=kind, key__in=keys)
+            postings = list(
+                RecipePosting.objects
+                .select_for_update()
+                .filter(condition, chunk=chunk)
+                .order_by('pk')
+            )
+            for posting in postings:
+                bitmap = decode(posting.data)
+                for position in positions[(posting.kind, posting.key)]:
+                    bitmap |= 1 << position
+                posting.data = encode(bitmap)
+            RecipePosting.objects.bulk_update(postings, ['data'])
+
+
+def update_recipe(recipe_id, old_keys):
+    """Переносит рецепт из ключей old_keys в его текущие ключи."""
+    new_keys = recipe_keys(recipe_id)
+    _apply(recipe_id, new_keys - old_keys, old_keys - new_keys)
+
+
+def remove_recipe(recipe_id):
+    _apply(recipe_id, set(), recipe_keys(recipe_id))
+
+
+def _sizes(recipes):
+    return dict(
+        RecipeIngredient.objects
+        .filter(recipes)
+        .values('recipe_id')
+        .annotate(size=Count('ingredient_id', distinct=True))
+        .values_list('recipe_id', 'size')
+    )
+
+
+def drop_key(kind, key, using=None):
+    """
+    Убирает из индекса удаляемый ингредиент или тег. Каскад удаления
+    связей идёт без сигналов, поэтому рецепты с ингредиентом
+    переносятся в списки нового размера после фиксации транзакции.
+    """
+    sizes = {}
+    if kind == INGREDIENT:
+        sizes = _sizes(Q(recipe__recipe_ingredients__ingredient_id=key))
+
+    def drop():
+        RecipePosting.objects.filter(kind=kind, key=key).delete()
+        # Размер считается заново: в той же транзакции могли удалить
+        # и другие ингредиенты этих рецептов.
+        current = _sizes(Q(recipe_id__in=sizes))
+        for recipe_id, size in sizes.items():
+            new_size = current.get(recipe_id, 0)
+            _apply(
+                recipe_id,
+                {(SIZE, new_size)} if new_size else set(),
+                {(SIZE, old) for old in range(new_size + 1, size + 1)},
+            )
+
+    transaction.on_commit(drop, using=using)
+
+
+def rebuild_chunk(chunk):
+    """Пересобирает все списки блока chunk по данным рецептов."""
+    low = chunk * CHUNK_SIZE
+    recipes = Q(recipe_id__gte=low, recipe_id__lt=low + CHUNK_SIZE)
+    positions = defaultdict(list)
+    sizes = defaultdict(int)
+    for recipe_id, ingredient_id in (
+        RecipeIngredient.objects
+        .filter(recipes)
+        .values_list('recipe_id', 'ingredient_id')
+        .iterator()
+    ):
+        positions[(INGREDIENT, ingredient_id)].append(recipe_id - low)
+        sizes[recipe_id] += 1
+    for recipe_id, size in sizes.items():
+        positions[(SIZE, size)].append(recipe_id - low)
+    for recipe_id, tag_id in (
+        Recipe.tags.through.objects
+        .filter(recipes)
+        .values_list('recipe_id', 'tag_id')
+        .iterator()
+    ):
+        positions[(TAG, tag_id)].append(recipe_id - low)
+    with transaction.atomic():
+        RecipePosting.objects.filter(chunk=chunk).delete()
+        RecipePosting.objects.bulk_create(
+            RecipePosting(
+                kind=kind, key=key, chunk=chunk,
+                data=_pack(sorted(set(recipe_positions))),
+            )
+            for (kind, key), recipe_positions in positions.items()
+        )
+
+
+def _equals(counter, count):
+    """Карта позиций, где побитовый счётчик равен count."""
+    if count >> len(counter):
+        return 0
+    result = FULL
+    for index, value in enumerate(counter):
+        result &= value if count >> index & 1 else value ^ FULL
+    return result
+
+
+def _descending(bitmap):
+    while bitmap:
+        position = bitmap.bit_length() - 1
+        yield position
+        bitmap ^= 1 << position
+
+
+class PantryMatches:
+    """
+    Найденные рецепты в порядке выдачи: меньше недостающих
+    ингредиентов, больше совпавших, новее. Поддерживает len() и срезы
+    списка (id, недостающих, совпавших), поэтому подходит для
+    пагинатора: id извлекаются только для запрошенной страницы.
+    """
+
+    def __init__(self, groups):
+        # [((недостающих, совпавших), {блок: карта})] в порядке выдачи.
+        self.groups = groups
+        self.counts = [
+            sum(bin(bitmap).count('1') for bitmap in chunks.values())
+            for _, chunks in groups
+        ]
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def _matches(self, skip):
+        for ((missing, matched), chunks), count in zip(
+            self.groups, self.counts
+        ):
+            if skip >= count:
+                skip -= count
+                continue
+            for chunk in sorted(chunks, reverse=True):
+                bitmap = chunks[chunk]
+                chunk_count = bin(bitmap).count('1')
+                if skip >= chunk_count:
+                    skip -= chunk_count
+                    continue
+                for position in _descending(bitmap):
+                    if skip:
+                        skip -= 1
+                        continue
+                    yield chunk * CHUNK_SIZE + position, missing, matched
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(len(self))
+        return list(islice(self._matches(start), max(stop - start, 0)))
+
+
+def search(ingredient_ids, tag_slugs=(), max_missing=0):
+    """
+    Рецепты, где есть хотя бы один из ingredient_ids и не хватает
+    не больше max_missing ингредиентов; при tag_slugs — только
+    с одним из тегов.
+    """
+    ingredient_ids = set(ingredient_ids)
+    max_size = len(ingredient_ids) + max_missing
+    condition = Q(kind=INGREDIENT, key__in=ingredient_ids) | Q(
+        kind=SIZE, key__lte=max_size
+    )
+    if tag_slugs:
+        condition |= Q(
+            kind=TAG,
+            key__in=Tag.objects.filter(slug__in=tag_slugs).values('id'),
+        )
+    chunks = defaultdict(lambda: defaultdict(list))
+    for kind, key, chunk, data in (
+        RecipePosting.objects
+        .filter(condition)
+        .values_list('kind', 'key', 'chunk', 'data')
+    ):
+        chunks[chunk][kind].append((key, decode(data)))
+
+    groups = defaultdict(dict)
+    for chunk, postings in chunks.items():
+        mask = FULL
+        if tag_slugs:
+            mask = 0
+            for _, bitmap in postings[TAG]:
+                mask |= bitmap
+        # counter[i] — i-й разряд числа совпавших ингредиентов.
+        counter = []
+        for _, bitmap in postings[INGREDIENT]:
+            carry = bitmap & mask
+            for index, value in enumerate(counter):
+                counter[index], carry = value ^ carry, value & carry
+                if not carry:
+                    break
+            if carry:
+                counter.append(carry)
+        equals = {}
+        for size, bitmap in postings[SIZE]:
+            bitmap &= mask
+            if not bitmap:
+                continue
+            for matched in range(
+                max(size - max_missing, 1), min(size, len(ingredient_ids)) + 1
+            ):
+                if matched not in equals:
+                    equals[matched] = _equals(counter, matched)
+                hits = bitmap & equals[matched]
+                if hits:
+                    groups[(size - matched, matched)][chunk] = hits
+    return PantryMatches([
+        (group, groups[group])
+        for group in sorted(groups, key=lambda group: (group[0], -group[1]))
+    ])
@@ -0,0 +1,126 @@
+"""
+Рейтинги «в тренде» и «популярное» по избранному и спискам покупок.
+
+Рейтинг — сумма весов событий, затухающая экспоненциально с
+периодом полураспада RANK_TRENDING_HALF_LIFE (RANK_POPULAR_HALF_LIFE).
+Все рейтинги затухают с одной скоростью, поэтому хранить можно
+сумму w * 2^((t - EPOCH) / half_life), не пересчитывая её со
+временем: порядок тот же. Колонки Recipe.trending_score и
+popular_score хранят логарифм этой суммы (сама сумма переполнила бы
+float), 0 — активности не было. Событие прибавляется или вычитается
+одним UPDATE строки рецепта (log-sum-exp в SQL), поэтому
+?ordering=trending — обычный проход по индексу. Периодическое
+сжатие (manage.py recipe_scores) обнуляет рейтинги, затухшие ниже
+RANK_MIN_SCORE: такие рецепты возвращаются к порядку по дате и не
+копят погрешность вычитаний. --rebuild пересчитывает всё с нуля.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils.timezone import now as current_time
+
+from api.constants import (RANK_FAVORITE_WEIGHT, RANK_MIN_SCORE,
+                           RANK_POPULAR_HALF_LIFE, RANK_SHOPPING_CART_WEIGHT,
+                           RANK_TRENDING_HALF_LIFE)
+
+from .models import Favorite, Recipe, ShoppingCart
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# Разница логарифмов, ниже которой вычитание обнуляет рейтинг.
+EPSILON = 1e-9
+SCORES = {
+    'trending_score': RANK_TRENDING_HALF_LIFE,
+    'popular_score': RANK_POPULAR_HALF_LIFE,
+}
+WEIGHTS = {
+    Favorite: RANK_FAVORITE_WEIGHT,
+    ShoppingCart: RANK_SHOPPING_CART_WEIGHT,
+}
+ORDERINGS = {
+    'trending': ('-trending_score', '-pub_date'),
+    'popular': ('-popular_score', '-pub_date'),
+}
+
+
+def exponent(moment, half_life, weight):
+    """Логарифм вклада события веса weight в момент moment."""
+    return math.log(weight) + (
+        (moment - EPOCH).total_seconds() * math.log(2) / half_life
+    )
+
+
+def _log_add(score, value):
+    if not score:
+        return value
+    return max(score, value) + math.log1p(math.exp(-abs(score - value)))
+
+
+def _update(recipe_id, moment, weight, add):
+    updates = {}
+    for field, half_life in SCORES.items():
+        value = exponent(moment, half_life, weight)
+        score, value_expr = F(field), Value(value)
+        if add:
+            updates[field] = Case(
+                When(**{f'{field}__lte': 0}, then=value_expr),
+                default=Greatest(score, value_expr) + Ln(
+                    Value(1.0) + Exp(-Abs(score - value_expr))
+                ),
+                output_field=FloatField(),
+            )
+        else:
+            updates[field] = Case(
+                When(**{f'{field}__lte': value + EPSILON}, then=Value(0.0)),
+                default=score + Ln(Value(1.0) - Exp(value_expr - score)),
+                output_field=FloatField(),
+            )
+    Recipe.objects.filter(pk=recipe_id).update(**updates)
+
+
+def add_event(recipe_id, moment, weight):
+    _update(recipe_id, moment, weight, add=True)
+
+
+def remove_event(recipe_id, moment, weight):
+    _update(recipe_id, moment, weight, add=False)
+
+
+def compact(now=None):
+    """Обнуляет затухшие рейтинги. Возвращает число обновлённых строк."""
+    now = now or current_time()
+    updated = 0
+    for field, half_life in SCORES.items():
+        floor = exponent(now, half_life, RANK_MIN_SCORE)
+        updated += Recipe.objects.filter(
+            **{f'{field}__gt': 0, f'{field}__lt': floor}
+        ).update(**{field: 0})
+    return updated
+
+
+def rebuild(batch_size=1000):
+    """Пересчитывает все рейтинги по избранному и спискам покупок."""
+    scores = defaultdict(lambda: dict.fromkeys(SCORES, 0))
+    for model, weight in WEIGHTS.items():
+        for recipe_id, created_at in (
+            model.objects.values_list('recipe_id', 'created_at').iterator()
+        ):
+            recipe_scores = scores[recipe_id]
+            for field, half_life in SCORES.items():
+                recipe_scores[field] = _log_add(
+                    recipe_scores[field],
+                    exponent(created_at, half_life, weight),
+                )
+    recipes = [
+        Recipe(pk=recipe_id, **recipe_scores)
+        for recipe_id, recipe_scores in scores.items()
+    ]
+    with transaction.atomic():
+        Recipe.objects.filter(
+            Q(trending_score__gt=0) | Q(popular_score__gt=0)
+        ).update(**dict.fromkeys(SCORES, 0))
+        Recipe.objects.bulk_update(recipes, list(SCORES), batch_size)
+    return len(recipes)
@@ -0,0 +1,125 @@
+"""
+Предсобранные ответы для полных списков тегов и ингредиентов.
+
+Полный список рендерится в JSON, gzip и brotli один раз на версию
+данных и хранится в памяти воркера; запрос без фильтров отдаёт
+готовые байты. Версия лежит в общем кеше и меняется сигналами при
+изменении тегов и ингредиентов; воркер сверяется с ней не чаще
+раза в REFERENCE_VERSION_CHECK_INTERVAL секунд. После bulk_create,
+update() и загрузки данных в обход ORM нужно вызвать bump_version.
+"""
+import gzip
+import time
+import uuid
+from collections import namedtuple
+
+import brotli
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.settings import api_settings
+
+from api.constants import REFERENCE_VERSION_CHECK_INTERVAL
+from foodgram_backend.metrics import cache_lookup
+
+from .fast_serializers import INGREDIENT_FIELDS, TAG_FIELDS
+from .models import Ingredient, Tag
+
+REFERENCE_DATA = {
+    'tags': (Tag, TAG_FIELDS),
+    'ingredients': (Ingredient, INGREDIENT_FIELDS),
+}
+
+
+Blob = namedtuple('Blob', 'version etag identity gzip br')
+
+
+_blobs = {}
+_checked = {}
+
+
+def _version_key(name):
+    return f'reference-version:{name}'
+
+
+def current_version(name):
+    now = time.monotonic()
+    checked_at, version = _checked.get(name, (None, None))
+    if (
+        checked_at is not None
+        and now - checked_at < REFERENCE_VERSION_CHECK_INTERVAL
+    ):
+        return version
+    version = cache.get(_version_key(name))
+    if version is None:
+        cache.add(_version_key(name), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(name))
+    _checked[name] = (now, version)
+    return version
+
+
+def bump_version(name):
+    version = uuid.uuid4().hex
+    cache.set(_version_key(name), version, None)
+    _checked[name] = (time.monotonic(), version)
+
+
+def get_blob(name):
+    version = current_version(name)
+    blob = _blobs.get(name)
+    hit = blob is not None and blob.version == version
+    cache_lookup('reference_blob', hit)
+    if not hit:
+        model, fields = REFERENCE_DATA[name]
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        body = renderer.render(list(model.objects.values(*fields)))
+        blob = Blob(
+            version=version,
+            etag=f'"{name}-{version}"',
+            identity=body,
+            gzip=gzip.compress(body, mtime=0),
+            br=brotli.compress(body),
+        )
+        _blobs[name] = blob
+    return blob
+
+
+def accepts_encoding(request, coding):
+    """
+    Принимает ли клиент кодировку coding по Accept-Encoding: указана
+    она сама или *, и q не равен нулю.
+    """
+    qualities = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        name, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get(coding, qualities.get('*', 0.0)) > 0
+
+
+def blob_response(request, name):
+    """Ответ с полным списком name в подходящей клиенту кодировке."""
+    blob = get_blob(name)
+    if blob.etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        if accepts_encoding(request, 'br'):
+            body, encoding = blob.br, 'br'
+        elif accepts_encoding(request, 'gzip'):
+            body, encoding = blob.gzip, 'gzip'
+        else:
+            body, encoding = blob.identity, None
+        response = HttpResponse(body, content_type='application/json')
+        response['Content-Length'] = len(body)
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = blob.etag
+    response['Vary'] = 'Accept, Accept-Encoding'
+    return response
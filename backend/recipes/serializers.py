@@ -2,11 +2,14 @@ from django.contrib.auth import get_user_model
 from django.db.models import Sum
 from rest_framework import serializers
 
+from api import jobs
 from api.serializers import UserReadSerializer
+from foodgram_backend.metrics import TimedRepresentationMixin, image_timer
 from api.constants import (
     MIN_COOKING_TIME, MAX_COOKING_TIME,
     MIN_INGREDIENT_AMOUNT, MAX_INGREDIENT_AMOUNT
 )
+from . import pantry, shopping_list
 from .models import (
     Favorite, Ingredient, Recipe,
     RecipeIngredient, ShoppingCart, Tag
@@ -62,7 +65,9 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(
+    TimedRepresentationMixin, serializers.ModelSerializer
+):
     """Сериализатор для чтения рецептов."""
 
     tags = TagSerializer(many=True, read_only=True)
@@ -95,6 +100,14 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeImageField(serializers.ImageField):
+    """ImageField с учётом времени проверки изображения в метриках."""
+
+    def to_internal_value(self, data):
+        with image_timer('recipe', 'validate'):
+            return super().to_internal_value(data)
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и обновления рецептов."""
 
@@ -107,7 +120,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         min_value=MIN_COOKING_TIME,
         max_value=MAX_COOKING_TIME,
     )
-    image = serializers.ImageField(required=True)
+    image = RecipeImageField(required=True)
 
     class Meta:
         model = Recipe
@@ -139,6 +152,9 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             for item in ingredients_data
         ]
         RecipeIngredient.objects.bulk_create(objs)
+        jobs.enqueue(
+            'recipes.index_similar', recipe.pk, key=f'similar:{recipe.pk}'
+        )
 
     def create(self, validated_data):
         tags = validated_data.pop('tags')
@@ -147,15 +163,23 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             author=self.context['request'].user, **validated_data)
         recipe.tags.set(tags)
         self._create_ingredients(recipe, ingredients_data)
+        pantry.update_recipe(recipe.pk, set())
+        jobs.enqueue('recipes.fan_out', recipe.pk)
         return recipe
 
     def update(self, instance, validated_data):
+        reindex = 'tags' in validated_data or 'ingredients' in validated_data
+        if reindex:
+            old_keys = pantry.recipe_keys(instance.pk)
         if 'tags' in validated_data:
             instance.tags.set(validated_data.pop('tags'))
         if 'ingredients' in validated_data:
             instance.recipe_ingredients.all().delete()
             self._create_ingredients(
                 instance, validated_data.pop('ingredients'))
+            shopping_list.recipes_changed([instance.pk])
+        if reindex:
+            pantry.update_recipe(instance.pk, old_keys)
         return super().update(instance, validated_data)
 
 
@@ -0,0 +1,85 @@
+"""
+Кеш скачиваемого списка покупок.
+
+У корзины каждого пользователя есть версия в общем кеше; она меняется
+после фиксации транзакции, в которой изменилась корзина (сигналы
+ShoppingCart) или ингредиенты рецепта из неё (recipes_changed).
+Готовый файл хранится под ключом из версии корзины, версии
+справочника ингредиентов (названия и единицы) и формата; та же
+тройка — ETag ответа, поэтому повторное скачивание без изменений —
+304 или файл из кеша без агрегации.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from api.constants import SHOPPING_LIST_CACHE_TIMEOUT
+from foodgram_backend.metrics import cache_lookup
+
+from . import reference_data
+from .models import ShoppingCart
+
+FORMATS = {
+    'txt': ('text/plain', 'shopping_list.txt'),
+}
+
+
+def _version_key(user_id):
+    return f'shopping-cart-version:{user_id}'
+
+
+def cart_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def bump_versions(user_ids):
+    """Новые версии корзин user_ids после фиксации транзакции."""
+    keys = [_version_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def recipes_changed(recipe_ids):
+    """Сбрасывает списки пользователей, у которых рецепты в корзине."""
+    bump_versions(
+        ShoppingCart.objects.filter(recipe_id__in=recipe_ids)
+        .values_list('user_id', flat=True)
+    )
+
+
+def file_response(request, render, file_format='txt'):
+    """
+    Файл списка покупок пользователя запроса; render(user) строит его
+    содержимое (bytes), если в кеше нет файла текущей версии.
+    """
+    user_id = request.user.pk
+    # Версия читается до агрегации: файл, собранный до изменения
+    # корзины, не попадёт под новую версию.
+    version = (
+        f'{cart_version(user_id)}-'
+        f'{reference_data.current_version("ingredients")}-{file_format}'
+    )
+    etag = f'"{version}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        key = f'shopping-list:{user_id}:{version}'
+        content = cache.get(key)
+        cache_lookup('shopping_list', content is not None)
+        if content is None:
+            content = render(request.user)
+            cache.set(key, content, SHOPPING_LIST_CACHE_TIMEOUT)
+        content_type, filename = FORMATS[file_format]
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,119 @@
+"""
+Короткие ссылки на рецепты.
+
+Код — base62 от id рецепта, переставленного обратимым аффинным
+отображением по модулю 62**6: код детерминирован, не выдаёт порядок
+id и раскодируется без базы. Существующие id кешируются в памяти
+воркера (LRU), поэтому переход по популярной ссылке не обращается
+к БД. Переходы копятся в памяти и записываются одним UPDATE раз
+в SHORT_LINK_FLUSH_CLICKS переходов или SHORT_LINK_FLUSH_INTERVAL
+секунд, а также при остановке процесса.
+"""
+import atexit
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.db.models import Case, F, Value, When
+
+from api.constants import (SHORT_LINK_ALPHABET, SHORT_LINK_CACHE_SIZE,
+                           SHORT_LINK_FLUSH_CLICKS, SHORT_LINK_FLUSH_INTERVAL,
+                           SHORT_LINK_MODULUS, SHORT_LINK_MULTIPLIER)
+from foodgram_backend.metrics import cache_lookup
+
+from .models import Recipe
+
+BASE = len(SHORT_LINK_ALPHABET)
+DIGITS = {char: value for value, char in enumerate(SHORT_LINK_ALPHABET)}
+INVERSE = pow(SHORT_LINK_MULTIPLIER, -1, SHORT_LINK_MODULUS)
+
+_known_ids = OrderedDict()
+_clicks = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def encode(recipe_id):
+    if not 0 < recipe_id < SHORT_LINK_MODULUS:
+        raise ValueError(f'id {recipe_id} вне диапазона коротких ссылок')
+    number = recipe_id * SHORT_LINK_MULTIPLIER % SHORT_LINK_MODULUS
+    chars = []
+    while number:
+        number, digit = divmod(number, BASE)
+        chars.append(SHORT_LINK_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def decode(code):
+    """id рецепта по коду или None, если код не выдавался encode."""
+    number = 0
+    for char in code:
+        digit = DIGITS.get(char)
+        if digit is None:
+            return None
+        number = number * BASE + digit
+    if not 0 < number < SHORT_LINK_MODULUS:
+        return None
+    recipe_id = number * INVERSE % SHORT_LINK_MODULUS
+    if encode(recipe_id) != code:
+        return None
+    return recipe_id
+
+
+def resolve(code):
+    """id существующего рецепта по коду или None."""
+    recipe_id = decode(code)
+    if recipe_id is None:
+        return None
+    with _lock:
+        hit = recipe_id in _known_ids
+        if hit:
+            _known_ids.move_to_end(recipe_id)
+    cache_lookup('short_link', hit)
+    if hit:
+        return recipe_id
+    if not Recipe.objects.filter(pk=recipe_id).exists():
+        return None
+    with _lock:
+        _known_ids[recipe_id] = True
+        if len(_known_ids) > SHORT_LINK_CACHE_SIZE:
+            _known_ids.popitem(last=False)
+    return recipe_id
+
+
+def forget(recipe_id):
+    with _lock:
+        _known_ids.pop(recipe_id, None)
+        _clicks.pop(recipe_id, None)
+
+
+def record_click(recipe_id):
+    with _lock:
+        _clicks[recipe_id] += 1
+        due = (
+            sum(_clicks.values()) >= SHORT_LINK_FLUSH_CLICKS
+            or time.monotonic() - _last_flush >= SHORT_LINK_FLUSH_INTERVAL
+        )
+    if due:
+        flush_clicks()
+
+
+def flush_clicks():
+    """Записывает накопленные переходы одним UPDATE."""
+    global _last_flush
+    with _lock:
+        pending = dict(_clicks)
+        _clicks.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    Recipe.objects.filter(pk__in=pending).update(
+        short_link_clicks=F('short_link_clicks') + Case(
+            *(When(pk=pk, then=Value(count))
+              for pk, count in pending.items()),
+            default=Value(0),
+        )
+    )
+
+
+atexit.register(flush_clicks)
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import pantry, ranking, reference_data, shopping_list, short_links
+from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def bump_reference_version(sender, **kwargs):
+    """Новая версия предсобранного списка после фиксации транзакции."""
+    name = 'tags' if sender is Tag else 'ingredients'
+    transaction.on_commit(lambda: reference_data.bump_version(name))
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_link(sender, instance, **kwargs):
+    short_links.forget(instance.pk)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_from_pantry_index(sender, instance, **kwargs):
+    pantry.remove_recipe(instance.pk)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def drop_from_pantry_index(sender, instance, using, **kwargs):
+    kind = pantry.TAG if sender is Tag else pantry.INGREDIENT
+    pantry.drop_key(kind, instance.pk, using)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def add_to_recipe_scores(sender, instance, created, **kwargs):
+    if created:
+        ranking.add_event(
+            instance.recipe_id, instance.created_at, ranking.WEIGHTS[sender]
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_recipe_scores(sender, instance, **kwargs):
+    ranking.remove_event(
+        instance.recipe_id, instance.created_at, ranking.WEIGHTS[sender]
+    )
+
+
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def bump_cart_version(sender, instance, **kwargs):
+    shopping_list.bump_versions([instance.user_id])
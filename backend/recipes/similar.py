@@ -0,0 +1,129 @@
+"""
+Похожие рецепты: MinHash по множеству ингредиентов и LSH.
+
+Для каждого рецепта хранится сигнатура из SIMILAR_NUM_HASHES
+минимальных хешей его ингредиентов (RecipeSignature): доля совпавших
+позиций двух сигнатур оценивает коэффициент Жаккара их множеств.
+Сигнатура режется на полосы по SIMILAR_BAND_ROWS хешей, хеш каждой
+полосы — ключ корзины LSH (RecipeSimilarityBand, индекс по ключу).
+Кандидаты — рецепты, совпавшие хотя бы в одной полосе; их сигнатуры
+сравниваются, лучшие SIMILAR_MAX_CANDIDATES по числу общих полос.
+Индекс живёт в базе, общий для всех воркеров, и обновляется при
+сохранении ингредиентов рецепта. Заполнить для существующих
+рецептов: manage.py build_similar_index.
+"""
+import hashlib
+import heapq
+import random
+import struct
+from operator import eq
+
+from django.db import transaction
+from django.db.models import Count
+
+from api.constants import (SIMILAR_BAND_ROWS, SIMILAR_HASH_SEED,
+                           SIMILAR_MAX_CANDIDATES, SIMILAR_NUM_HASHES)
+
+from .models import RecipeSignature, RecipeSimilarityBand
+
+PRIME = (1 << 61) - 1
+MASK = 0xFFFFFFFF
+SIGNATURE = struct.Struct(f'<{SIMILAR_NUM_HASHES}I')
+BAND = struct.Struct(f'<H{SIMILAR_BAND_ROWS}I')
+
+_random = random.Random(SIMILAR_HASH_SEED)
+COEFFICIENTS = [
+    (_random.randrange(1, PRIME), _random.randrange(PRIME))
+    for _ in range(SIMILAR_NUM_HASHES)
+]
+del _random
+
+
+def signature(ingredient_ids):
+    """MinHash-сигнатура множества id ингредиентов."""
+    return tuple(
+        min(((a * x + b) % PRIME) & MASK for x in ingredient_ids)
+        for a, b in COEFFICIENTS
+    )
+
+
+def band_keys(values):
+    """Ключи корзин LSH: по одному на полосу сигнатуры."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                BAND.pack(band, *values[start:start + SIMILAR_BAND_ROWS]),
+                digest_size=8,
+            ).digest(),
+            'little',
+            signed=True,
+        )
+        for band, start in enumerate(
+            range(0, SIMILAR_NUM_HASHES, SIMILAR_BAND_ROWS)
+        )
+    ]
+
+
+def index_recipes(recipes):
+    """Пересчитывает сигнатуры и корзины: {id рецепта: id ингредиентов}."""
+    signatures, bands = [], []
+    for recipe_id, ingredient_ids in recipes.items():
+        if not ingredient_ids:
+            continue
+        values = signature(ingredient_ids)
+        signatures.append(RecipeSignature(
+            recipe_id=recipe_id, minhash=SIGNATURE.pack(*values)
+        ))
+        bands.extend(
+            RecipeSimilarityBand(recipe_id=recipe_id, key=key)
+            for key in band_keys(values)
+        )
+    with transaction.atomic():
+        RecipeSimilarityBand.objects.filter(recipe_id__in=recipes).delete()
+        RecipeSignature.objects.filter(recipe_id__in=recipes).delete()
+        RecipeSignature.objects.bulk_create(signatures)
+        RecipeSimilarityBand.objects.bulk_create(bands)
+
+
+def index_recipe(recipe_id, ingredient_ids):
+    index_recipes({recipe_id: ingredient_ids})
+
+
+def similar_recipes(recipe_id, limit):
+    """
+    До limit id рецептов, похожих на recipe_id, от самого похожего,
+    с оценкой коэффициента Жаккара: [(id, score)].
+    """
+    minhash = (
+        RecipeSignature.objects
+        .filter(recipe_id=recipe_id)
+        .values_list('minhash', flat=True)
+        .first()
+    )
+    if minhash is None:
+        return []
+    values = SIGNATURE.unpack(bytes(minhash))
+    candidates = [
+        candidate_id
+        for candidate_id, _ in (
+            RecipeSimilarityBand.objects
+            .filter(key__in=band_keys(values))
+            .exclude(recipe_id=recipe_id)
+            .values_list('recipe_id')
+            .annotate(bands=Count('id'))
+            .order_by('-bands', '-recipe_id')
+            [:SIMILAR_MAX_CANDIDATES]
+        )
+    ]
+    scored = (
+        (sum(map(eq, values, SIGNATURE.unpack(bytes(other)))), candidate_id)
+        for candidate_id, other in (
+            RecipeSignature.objects
+            .filter(recipe_id__in=candidates)
+            .values_list('recipe_id', 'minhash')
+        )
+    )
+    return [
+        (candidate_id, matches / SIMILAR_NUM_HASHES)
+        for matches, candidate_id in heapq.nlargest(limit, scored)
+    ]
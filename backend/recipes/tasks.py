@@ -0,0 +1,35 @@
+"""Отложенные задачи рецептов для очереди api.jobs."""
+from api.jobs import task
+
+from . import feed, ranking, similar
+from .models import Recipe, RecipeIngredient
+
+
+@task('recipes.fan_out', priority=10)
+def fan_out(recipe_id):
+    """Рассылка нового рецепта по лентам подписчиков."""
+    recipe = (
+        Recipe.objects.select_related('author').filter(pk=recipe_id).first()
+    )
+    if recipe is not None:
+        feed.fan_out_recipe(recipe)
+
+
+@task('recipes.index_similar', priority=5)
+def index_similar(recipe_id):
+    """Пересчёт сигнатуры похожих рецептов по текущим ингредиентам."""
+    similar.index_recipe(recipe_id, list(
+        RecipeIngredient.objects
+        .filter(recipe_id=recipe_id)
+        .values_list('ingredient_id', flat=True)
+    ))
+
+
+@task('recipes.compact_scores', every=3600)
+def compact_scores():
+    ranking.compact()
+
+
+@task('recipes.trim_feeds', every=3600)
+def trim_feeds():
+    feed.trim_timelines()
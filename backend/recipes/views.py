@@ -1,16 +1,34 @@
 import base64
 import uuid
+import zipfile
 
 from django.core.files.base import ContentFile
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
-
-from .filters import RecipeFilter
+from rest_framework.utils.urls import replace_query_param
+
+from api.constants import (FEED_MAX_PAGE_SIZE, FEED_PAGE_SIZE,
+                           INGREDIENT_SEARCH_LIMIT, PANTRY_DEFAULT_MISSING,
+                           PANTRY_MAX_INGREDIENTS, PANTRY_MAX_MISSING,
+                           SIMILAR_MAX_PAGE_SIZE, SIMILAR_PAGE_SIZE)
+from foodgram_backend.metrics import image_timer
+from foodgram_backend.server_timing import ServerTimingMixin
+
+from . import (bulk_import, export, feed, pantry, reference_data,
+               shopping_list, short_links, similar)
+from .fast_serializers import (recipe_columns, represent_recipes,
+                               requested_fields)
+from .filters import IngredientSearchFilter, RecipeFilter
 from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from .pagination import RecipePagination
 from .permissions import IsAuthorOrReadOnly
@@ -19,7 +37,37 @@ from .serializers import (DownloadShoppingCartSerializer, IngredientSerializer,
                           RecipeReadSerializer, TagSerializer)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+def render_shopping_list(user):
+    """Текст списка покупок: ингредиенты корзины, суммы по каждому."""
+    data = DownloadShoppingCartSerializer(user).data['ingredients']
+    return '\n'.join(
+        f"({item['name']} ({item['unit']}) — {item['amount']})"
+        for item in data
+    ).encode()
+
+
+class ReferenceListMixin:
+    """Полный список без фильтров отдаётся предсобранным (reference_data)."""
+
+    reference_name = None
+
+    def is_filtered(self, request):
+        return False
+
+    def list(self, request, *args, **kwargs):
+        if (
+            request.accepted_renderer.format == 'json'
+            and 'indent' not in request.accepted_media_type
+            and not self.is_filtered(request)
+        ):
+            self.headers['Vary'] = 'Accept, Accept-Encoding'
+            return reference_data.blob_response(request, self.reference_name)
+        return super().list(request, *args, **kwargs)
+
+
+class TagViewSet(
+    ServerTimingMixin, ReferenceListMixin, viewsets.ReadOnlyModelViewSet
+):
     """Список и просмотре тегов."""
 
     queryset = Tag.objects.all()
@@ -27,21 +75,31 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     lookup_field = 'id'
     pagination_class = None
+    reference_name = 'tags'
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ServerTimingMixin, ReferenceListMixin, viewsets.ReadOnlyModelViewSet
+):
     """Спислк и просмотр рецептов."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['^name']
-    search_param = 'name'
+    filter_backends = [IngredientSearchFilter]
+    search_fields = ['name']
+    search_limit = INGREDIENT_SEARCH_LIMIT
     pagination_class = None
+    reference_name = 'ingredients'
+    throttle_scope = 'ingredients'
+
+    def is_filtered(self, request):
+        return bool(
+            request.query_params.get(IngredientSearchFilter.search_param)
+        )
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ServerTimingMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all().prefetch_related('tags', 'ingredients')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly,
                           IsAuthorOrReadOnly]
@@ -49,6 +107,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
 
     pagination_class = RecipePagination
+    # Общий лимит 'user'/'anon'; у отдельных action — свой scope.
+    throttle_scope = None
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -63,7 +123,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             header, b64 = image.split(';base64', 1)
             ext = header.split('/')[-1]
             try:
-                decoded = base64.b64decode(b64)
+                with image_timer('recipe', 'decode'):
+                    decoded = base64.b64decode(b64)
             except (TypeError, ValueError):
                 return Response(
                     {'image': 'Некорректный base64.'},
@@ -80,19 +141,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         params = request.query_params
+        fields = requested_fields(params)
 
         if 'is_in_shopping_cart' in params:
-            return super().list(request, *args, **kwargs)
+            return self._fast_list(request, fields)
 
         if 'is_favorited' in params or 'author' in params:
-            return super().list(request, *args, **kwargs)
+            return self._fast_list(request, fields)
 
         tags = params.getlist('tags')
         if not tags:
             return Response(
                 {'count': 0, 'next': None, 'previous': None, 'results': []}
             )
-        return super().list(request, *args, **kwargs)
+        return self._fast_list(request, fields)
+
+    def _fast_list(self, request, fields):
+        """
+        Список в формате RecipeReadSerializer без полей DRF на запись.
+        Читаются только колонки и связи для полей fields (?fields=, ?omit=).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.prefetch_related(None).values(*recipe_columns(fields))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(represent_recipes(request, rows, fields))
+        return self.get_paginated_response(
+            represent_recipes(request, page, fields)
+        )
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -104,7 +180,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             header, b64 = image.split(';base64,', 1)
             ext = header.split('/')[-1]
             try:
-                decoded = base64.b64decode(b64)
+                with image_timer('recipe', 'decode'):
+                    decoded = base64.b64decode(b64)
             except (TypeError, ValueError):
                 return Response(
                     {'image': 'Некорректный base64.'},
@@ -188,23 +265,205 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
-        detail=False, methods=['get'], permission_classes=[IsAuthenticated]
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        throttle_scope='shopping_cart_download',
     )
     def download_shopping_cart(self, request):
-        """GET /recipes/download_shopping_cart/ — скачивание списка покупок."""
+        """
+        GET /recipes/download_shopping_cart/ — скачивание списка покупок;
+        304, если If-None-Match совпал с ETag текущей версии корзины.
+        """
+        return shopping_list.file_response(request, render_shopping_list)
 
-        serializer = DownloadShoppingCartSerializer(request.user)
-        data = serializer.data['ingredients']
-        lines = [
-            f"({item['name']} ({item['unit']}) — {item['amount']})"
-            for item in data
-        ]
-        content = '\n'.join(lines)
-        response = HttpResponse(content, content_type='text/plain')
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='export',
+        permission_classes=[IsAdminUser],
+    )
+    def export_recipes(self, request):
+        """
+        GET /recipes/export/?since= — все рецепты в NDJSON потоком;
+        gzip, если клиент его принимает.
+        """
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = export.parse_since(since)
+            except ValueError as error:
+                raise ValidationError({'since': [str(error)]})
+        chunks = export.export_lines(request, since or None)
+        compress = reference_data.accepts_encoding(request, 'gzip')
+        if compress:
+            chunks = export.gzip_chunks(chunks)
+        if settings.ASYNC_API:
+            chunks = export.async_chunks(chunks)
+        response = StreamingHttpResponse(
+            chunks, content_type='application/x-ndjson'
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"')
+            'attachment; filename="recipes.ndjson"')
+        response['Vary'] = 'Accept-Encoding'
         return response
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        permission_classes=[IsAuthenticated],
+        parser_classes=[MultiPartParser],
+        throttle_scope='recipe_import',
+    )
+    def import_recipes(self, request):
+        """
+        POST /recipes/import/ — пакетный импорт рецептов текущего
+        пользователя: file (NDJSON или CSV) и images (ZIP-архив).
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': [bulk_import.REQUIRED]})
+        images = request.FILES.get('images')
+        if images is not None:
+            try:
+                images = bulk_import.ImageArchive(images)
+            except zipfile.BadZipFile:
+                raise ValidationError({'images': ['Ожидается ZIP-архив.']})
+        rows = bulk_import.read_rows(
+            upload,
+            bulk_import.detect_format(upload.name, request.data.get('format')),
+        )
+        report = bulk_import.Importer(request.user, images).run(rows)
+        return Response(report)
+
+    @action(
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        """GET /recipes/feed/ — рецепты авторов из подписок, новые сверху."""
+
+        fields = requested_fields(request.query_params)
+        try:
+            limit = min(
+                int(request.query_params.get('limit', FEED_PAGE_SIZE)),
+                FEED_MAX_PAGE_SIZE,
+            )
+        except ValueError:
+            limit = FEED_PAGE_SIZE
+        limit = max(limit, 1)
+        recipe_ids, next_position = feed.get_feed_page(
+            request.user, limit, request.query_params.get('cursor')
+        )
+        recipes = Recipe.objects.filter(id__in=recipe_ids).values(
+            *recipe_columns(fields)
+        )
+        recipes = sorted(recipes, key=lambda r: recipe_ids.index(r['id']))
+        next_url = None
+        if next_position is not None:
+            next_url = replace_query_param(
+                request.build_absolute_uri(),
+                'cursor',
+                feed.encode_cursor(*next_position),
+            )
+        return Response({
+            'next': next_url,
+            'results': represent_recipes(request, recipes, fields),
+        })
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='pantry',
+        permission_classes=[AllowAny]
+    )
+    def from_pantry(self, request):
+        """
+        GET /recipes/pantry/?ingredients=1,2,3 — рецепты, которые можно
+        приготовить из этих ингредиентов или докупив не больше
+        max_missing; сначала те, где недостающих меньше.
+        """
+
+        params = request.query_params
+        fields = requested_fields(params)
+        try:
+            ingredient_ids = {
+                int(value)
+                for values in params.getlist('ingredients')
+                for value in values.split(',') if value.strip()
+            }
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': ['Ожидаются id ингредиентов.']}
+            )
+        if not ingredient_ids:
+            raise ValidationError(
+                {'ingredients': ['Укажите хотя бы один ингредиент.']}
+            )
+        if len(ingredient_ids) > PANTRY_MAX_INGREDIENTS:
+            raise ValidationError({'ingredients': [
+                f'Не больше {PANTRY_MAX_INGREDIENTS} ингредиентов.'
+            ]})
+        try:
+            max_missing = min(
+                int(params.get('max_missing', PANTRY_DEFAULT_MISSING)),
+                PANTRY_MAX_MISSING,
+            )
+        except ValueError:
+            max_missing = PANTRY_DEFAULT_MISSING
+        max_missing = max(max_missing, 0)
+        matches = pantry.search(
+            ingredient_ids, params.getlist('tags'), max_missing
+        )
+        page = self.paginate_queryset(matches)
+        rows = {
+            row['id']: row
+            for row in Recipe.objects.filter(
+                id__in=[recipe_id for recipe_id, _, _ in page]
+            ).values(*recipe_columns(fields))
+        }
+        page = [match for match in page if match[0] in rows]
+        results = represent_recipes(
+            request, [rows[recipe_id] for recipe_id, _, _ in page], fields
+        )
+        for result, (_, missing, matched) in zip(results, page):
+            result['matched_ingredients'] = matched
+            result['missing_ingredients'] = missing
+        return self.get_paginated_response(results)
+
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='similar',
+        permission_classes=[AllowAny]
+    )
+    def similar_recipes(self, request, pk=None):
+        """
+        GET /recipes/{id}/similar/ — рецепты с похожим набором
+        ингредиентов, самые похожие первыми.
+        """
+
+        get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        fields = requested_fields(request.query_params)
+        try:
+            limit = min(
+                int(request.query_params.get('limit', SIMILAR_PAGE_SIZE)),
+                SIMILAR_MAX_PAGE_SIZE,
+            )
+        except ValueError:
+            limit = SIMILAR_PAGE_SIZE
+        limit = max(limit, 1)
+        recipe_ids = [
+            recipe_id for recipe_id, _ in similar.similar_recipes(pk, limit)
+        ]
+        recipes = Recipe.objects.filter(id__in=recipe_ids).values(
+            *recipe_columns(fields)
+        )
+        recipes = sorted(recipes, key=lambda r: recipe_ids.index(r['id']))
+        return Response(represent_recipes(request, recipes, fields))
+
     @action(
         detail=True,
         methods=['get'],
@@ -212,5 +471,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[AllowAny]
     )
     def get_link(self, request, pk=None):
-        url = reverse('recipes-detail', kwargs={'pk': pk}, request=request)
+        recipe = self.get_object()
+        url = reverse(
+            'short-link',
+            kwargs={'code': short_links.encode(recipe.pk)},
+            request=request,
+        )
         return Response({'short-link': url})
+
+
+def short_link_redirect(request, code):
+    """GET /s/<code>/ — переход на страницу рецепта."""
+
+    recipe_id = short_links.resolve(code)
+    if recipe_id is None:
+        raise Http404
+    short_links.record_click(recipe_id)
+    return HttpResponseRedirect(f'/recipes/{recipe_id}')
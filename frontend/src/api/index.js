@@ -132,6 +132,7 @@ class Api {
     is_in_shopping_cart = 0,
     author,
     tags,
+    omit = "text,ingredients",
   } = {}) {
     const token = localStorage.getItem("token");
     const authorization = token ? { authorization: `Token ${token}` } : {};
@@ -146,7 +147,7 @@ class Api {
         author ? `&author=${author}` : ""
       }${is_favorited ? `&is_favorited=${is_favorited}` : ""}${
         is_in_shopping_cart ? `&is_in_shopping_cart=${is_in_shopping_cart}` : ""
-      }${tagsString}`,
+      }${omit ? `&omit=${omit}` : ""}${tagsString}`,
       {
         method: "GET",
         headers: {
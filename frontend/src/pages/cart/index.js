@@ -17,7 +17,8 @@ const Cart = ({ updateOrders, orders }) => {
       .getRecipes({
         page: 1,
         limit: 999,
-        is_in_shopping_cart: Number(true)
+        is_in_shopping_cart: Number(true),
+        omit: 'text'
       })
       .then(res => {
         const { results } = res